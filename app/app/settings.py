@@ -136,12 +136,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
     )
 }
 
 AUTH_USER_MODEL = 'user.User'
 
+USER_CACHE_TIMEOUT = 60
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -172,12 +174,41 @@ SIMPLE_JWT = {
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'store.cache.SQLiteCache',
+        'LOCATION': BASE_DIR / 'cache.sqlite3',
         'TIMEOUT': 3600,
         'OPTIONS': {
-            'MAX_ENTRIES': 1000
+            'MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 1
+        }
+    },
+    'products': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'products',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000
         }
     }
 }
 
+TEST_RUNNER = 'app.test_runner.TestRunner'
+
+IDEMPOTENCY_STORE = 'store.idempotency.DatabaseIdempotencyStore'
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_KEY_LEASE = 60
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+
+ORDER_ASYNC_INTAKE = False
+
+FAST_SERIALIZATION = False
+
+# The dolar blue rate is refreshed in the background, by a thread in each
+# web process or by the refresh_exchange_rate command (shared cache only).
+EXCHANGE_RATE_REFRESH_THREAD = True
+EXCHANGE_RATE_REFRESH_INTERVAL = 60 * 10
+EXCHANGE_RATE_TIMEOUT = 5
+EXCHANGE_RATE_BACKOFF = 5
+EXCHANGE_RATE_MAX_BACKOFF = 60 * 10
+
+PRODUCT_CACHE_ALIAS = 'products'
+PRODUCT_CACHE_TIMEOUT = 60
@@ -0,0 +1,36 @@
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def isolate_default_cache(directory):
+    """
+    Point the default cache to a database in ``directory``, so tests and
+    benchmarks never read or clear the cache of the development server.
+    """
+    caches = dict(settings.CACHES)
+    caches['default'] = dict(
+        caches['default'],
+        LOCATION=f'{directory}/cache.sqlite3'
+    )
+    cache_settings = override_settings(CACHES=caches)
+    cache_settings.enable()
+    return cache_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    ``DiscoverRunner`` with the default cache in a temporary directory.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_directory = tempfile.TemporaryDirectory()
+        self.cache_settings = isolate_default_cache(self.cache_directory.name)
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        self.cache_directory.cleanup()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,47 @@
+"""
+Benchmarks run against a throwaway test database, from the ``app``
+directory::
+
+    python -m benchmarks.<name>
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import django
+
+_cache_directory = None
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    django.setup()
+
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from app.test_runner import isolate_default_cache
+
+    global _cache_directory
+    setup_test_environment()
+    _cache_directory = tempfile.TemporaryDirectory()
+    isolate_default_cache(_cache_directory.name)
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def teardown():
+    from django.db import connection
+
+    connection.creation.destroy_test_db(
+        connection.settings_dict['NAME'],
+        verbosity=0
+    )
+    _cache_directory.cleanup()
+
+
+@contextmanager
+def timer(label, rows):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed:.3f}s ({rows / elapsed:,.0f} rows/s)")
@@ -0,0 +1,46 @@
+"""
+Compares authenticating a request with ``JWTAuthentication``, which loads
+the user on every request, and ``CachedJWTAuthentication``.
+
+    python -m benchmarks.authentication [requests]
+"""
+import sys
+
+from benchmarks import setup, teardown, timer
+
+REQUESTS = 5_000
+
+
+def run(requests):
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+    from user.authentication import CachedJWTAuthentication
+    from user.models import get_user_cache_key
+
+    user = get_user_model().objects.create_user(
+        email='benchmark@test.com',
+        password='benchmark'
+    )
+    cache.delete(get_user_cache_key(user.pk))
+    request = Request(APIRequestFactory().get(
+        '/api/user/me/',
+        HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}'
+    ))
+
+    for authentication in (JWTAuthentication(), CachedJWTAuthentication()):
+        with timer(type(authentication).__name__, requests):
+            for _ in range(requests):
+                authentication.authenticate(request)
+    cache.delete(get_user_cache_key(user.pk))
+
+
+if __name__ == '__main__':
+    setup()
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else REQUESTS)
+    finally:
+        teardown()
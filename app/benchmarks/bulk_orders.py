@@ -0,0 +1,46 @@
+"""
+Compares creating 1,000 orders one POST at a time with a single
+``POST /api/orders/bulk/``.
+"""
+from benchmarks import setup, teardown, timer
+
+ORDERS = 1000
+PRODUCTS = 50
+
+
+def run():
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from store.models import Product, Order
+
+    client = APIClient()
+    products = Product.objects.bulk_create([
+        Product(name=f"product {i}", price=10, stock=ORDERS * 10)
+        for i in range(PRODUCTS)
+    ])
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    assert len(product_ids) == len(products)
+    payload = [
+        {'details': [
+            {'product': product_ids[(i + j) % PRODUCTS], 'cuantity': 1}
+            for j in range(3)
+        ]}
+        for i in range(ORDERS)
+    ]
+
+    with timer("single order POST", ORDERS):
+        for order in payload:
+            client.post(reverse('store:order-list'), order, format='json')
+
+    with timer("bulk POST", ORDERS):
+        client.post(reverse('store:bulk_create'), payload, format='json')
+
+    assert Order.objects.count() == ORDERS * 2
+
+
+if __name__ == '__main__':
+    setup()
+    try:
+        run()
+    finally:
+        teardown()
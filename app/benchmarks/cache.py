@@ -0,0 +1,60 @@
+"""
+Compares the latency of the default cache backend with ``LocMemCache``
+and ``FileBasedCache``.
+
+    python -m benchmarks.cache [operations]
+"""
+import os
+import sys
+import tempfile
+
+from benchmarks import setup, teardown, timer
+
+OPERATIONS = 5_000
+KEYS = 500
+VALUE = {'name': 'product', 'price': '217.50', 'stock': 10}
+
+
+def run(operations):
+    from django.core.cache.backends.filebased import FileBasedCache
+    from django.core.cache.backends.locmem import LocMemCache
+    from store.cache import SQLiteCache
+
+    directory = tempfile.TemporaryDirectory()
+    location = os.path.join(directory.name, 'cache.sqlite3')
+    options = {'OPTIONS': {'MAX_ENTRIES': KEYS * 2}}
+    backends = {
+        'LocMemCache': LocMemCache('benchmark', options),
+        'FileBasedCache': FileBasedCache(
+            os.path.join(directory.name, 'files'),
+            options
+        ),
+        'SQLiteCache': SQLiteCache(location, options),
+        'SQLiteCache L1': SQLiteCache(location + '.l1', {
+            'OPTIONS': {
+                'MAX_ENTRIES': KEYS * 2,
+                'L1_TIMEOUT': 1,
+                'L1_MAX_ENTRIES': KEYS
+            }
+        }),
+    }
+    keys = [f'key:{i}' for i in range(KEYS)]
+
+    try:
+        for label, cache in backends.items():
+            with timer(f"{label} set", operations):
+                for i in range(operations):
+                    cache.set(keys[i % KEYS], VALUE)
+            with timer(f"{label} get", operations):
+                for i in range(operations):
+                    cache.get(keys[i % KEYS])
+    finally:
+        directory.cleanup()
+
+
+if __name__ == '__main__':
+    setup()
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else OPERATIONS)
+    finally:
+        teardown()
@@ -0,0 +1,58 @@
+"""
+Streams the order export for growing order counts and reports the peak
+memory allocated while consuming it, which should not grow with the
+number of rows.
+
+    python -m benchmarks.exports [rows]
+"""
+import sys
+import tracemalloc
+
+from benchmarks import setup, teardown, timer
+
+ROWS = 1_000_000
+
+
+def run(rows):
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from store.models import Product, Order, OrderDetail
+
+    product = Product.objects.create(name="product", price=10, stock=1)
+    client = APIClient()
+    url = reverse('store:order_export')
+
+    exported = 0
+    size = 1000
+    while size <= rows:
+        Order.objects.bulk_create([
+            Order(total=10, line_count=1)
+            for _ in range(size - exported)
+        ], batch_size=10_000)
+        orders = Order.objects.filter(details__isnull=True) \
+                              .values_list('id', flat=True)
+        OrderDetail.objects.bulk_create([
+            OrderDetail(order_id=order_id, product=product, cuantity=1,
+                        unit_price=product.price)
+            for order_id in orders.iterator()
+        ], batch_size=10_000)
+        exported = size
+
+        for label, params in (('NDJSON', {}), ('CSV', {'format': 'csv'})):
+            tracemalloc.start()
+            with timer(f"{label} export of {size:,} orders", size):
+                res = client.get(url, params)
+                for _ in res.streaming_content:
+                    pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"  peak memory: {peak / 2 ** 20:.1f} MiB")
+        size *= 10
+
+
+if __name__ == '__main__':
+    setup()
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
+    finally:
+        teardown()
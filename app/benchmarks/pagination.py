@@ -0,0 +1,61 @@
+"""
+Compares fetching the first and the last page of products with OFFSET
+pagination and with the keyset pagination used by ``/api/products/``.
+
+    python -m benchmarks.pagination [rows]
+"""
+import sys
+
+from benchmarks import setup, teardown, timer
+
+ROWS = 1_000_000
+PAGE_SIZE = 100
+REPEAT = 20
+
+
+def run(rows):
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from store.api.pagination import ProductPagination
+    from store.models import Product
+
+    for start in range(0, rows, 50_000):
+        Product.objects.bulk_create([
+            Product(name=f"product {i}", price=10, stock=1)
+            for i in range(start, min(start + 50_000, rows))
+        ])
+
+    products = Product.objects.order_by('id')
+    last_offset = rows - PAGE_SIZE
+    last_position = products.values_list('id', flat=True)[last_offset - 1]
+
+    for label, offset, position in (
+        ('first page', 0, 0),
+        ('last page', last_offset, last_position),
+    ):
+        with timer(f"OFFSET {label}", PAGE_SIZE * REPEAT):
+            for _ in range(REPEAT):
+                list(products[offset:offset + PAGE_SIZE])
+
+        with timer(f"keyset {label}", PAGE_SIZE * REPEAT):
+            for _ in range(REPEAT):
+                list(products.filter(id__gt=position)[:PAGE_SIZE])
+
+    client = APIClient()
+    url = reverse('store:product-list')
+    paginator = ProductPagination()
+    paginator.base_url = url
+    paginator.keys = [('id', False)]
+    cursor = paginator.encode_cursor({'id': last_position}, reverse=False)
+    with timer("GET /api/products/ last page", PAGE_SIZE * REPEAT):
+        for _ in range(REPEAT):
+            res = client.get(cursor)
+    assert len(res.data['results']) == PAGE_SIZE
+
+
+if __name__ == '__main__':
+    setup()
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
+    finally:
+        teardown()
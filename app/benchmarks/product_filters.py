@@ -0,0 +1,65 @@
+"""
+Prints the query plan of the product list filters and orderings, on
+the database configured in the settings (SQLite or PostgreSQL), and
+times them through ``/api/products/``.
+
+    python -m benchmarks.product_filters [rows]
+"""
+import sys
+
+from benchmarks import setup, teardown, timer
+
+ROWS = 200_000
+REPEAT = 20
+
+FILTERS = (
+    {'name': 'product 1999'},
+    {'price_min': '10', 'price_max': '10.50'},
+    {'in_stock': 'true'},
+    {'ordering': 'price'},
+    {'ordering': '-stock'},
+)
+
+
+def run(rows):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from store.models import Product
+
+    for start in range(0, rows, 50_000):
+        Product.objects.bulk_create([
+            Product(
+                name=f"product {i}",
+                price=i % 10_000 / 100,
+                stock=0 if i % 100 else i % 7
+            )
+            for i in range(start, min(start + 50_000, rows))
+        ])
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+    client = APIClient()
+    url = reverse('store:product-list')
+    for params in FILTERS:
+        with CaptureQueriesContext(connection) as context:
+            client.get(url, params)
+        sql = context.captured_queries[-1]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}")
+            plan = cursor.fetchall()
+        print(params)
+        print('\n'.join(' '.join(map(str, row)) for row in plan))
+
+        with timer(f"GET /api/products/ {params}", REPEAT):
+            for _ in range(REPEAT):
+                client.get(url, params)
+
+
+if __name__ == '__main__':
+    setup()
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
+    finally:
+        teardown()
@@ -0,0 +1,60 @@
+"""
+Compares the model serializers with the ``values()`` fast path used by
+the list endpoints when ``FAST_SERIALIZATION`` is enabled.
+
+    python -m benchmarks.serialization [rows]
+"""
+import sys
+
+from benchmarks import setup, teardown, timer
+
+ROWS = 50_000
+DETAILS_PER_ORDER = 3
+
+
+def run(rows):
+    from django.core.cache import cache
+    from store.api.fast_serializers import FastProductSerializer, \
+        FastOrderSerializer
+    from store.api.serializers import ProductSerializer, OrderSerializer
+    from store.models import Product, Order, OrderDetail
+
+    cache.set("dolar_blue", "217,50")
+    Product.objects.bulk_create([
+        Product(name=f"product {i}", price=10, stock=1)
+        for i in range(rows)
+    ], batch_size=10_000)
+    Order.objects.bulk_create([
+        Order(total=30, line_count=DETAILS_PER_ORDER)
+        for _ in range(rows)
+    ], batch_size=10_000)
+    products = list(Product.objects.order_by('id')[:DETAILS_PER_ORDER])
+    orders = list(Order.objects.order_by('id'))
+    OrderDetail.objects.bulk_create([
+        OrderDetail(order=order, product=products[i], cuantity=1,
+                    unit_price=products[i].price)
+        for order in orders
+        for i in range(DETAILS_PER_ORDER)
+    ], batch_size=10_000)
+
+    queryset = Product.objects.with_shards_stock().order_by('id')
+    with timer("ProductSerializer", rows):
+        ProductSerializer(queryset, many=True).data
+    fast = FastProductSerializer()
+    with timer("FastProductSerializer", rows):
+        fast.serialize(fast.get_values(queryset))
+
+    queryset = Order.objects.with_details().order_by('date_time', 'id')
+    with timer("OrderSerializer", rows):
+        OrderSerializer(queryset, many=True).data
+    fast = FastOrderSerializer()
+    with timer("FastOrderSerializer", rows):
+        fast.serialize(fast.get_values(queryset))
+
+
+if __name__ == '__main__':
+    setup()
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS)
+    finally:
+        teardown()
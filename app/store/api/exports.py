@@ -0,0 +1,99 @@
+import csv
+import json
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from .fast_serializers import FastProductSerializer, FastOrderSerializer
+
+EXPORT_CHUNK_SIZE = 2000
+
+PRODUCT_COLUMNS = ('id', 'name', 'stock', 'price')
+ORDER_COLUMNS = (
+    'id', 'date_time', 'status', 'get_total', 'get_total_usd',
+    'detail_id', 'product', 'cuantity'
+)
+
+
+class Echo:
+    """
+    File-like object whose ``write`` hands the csv line back instead of
+    storing it, so ``csv.writer`` can feed a streamed response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def product_records(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    serializer = FastProductSerializer()
+    rows = serializer.get_values(queryset).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield serializer.to_representation(row)
+
+
+def order_records(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Orders are read with a chunked ``iterator()``, the details of each
+    chunk are then fetched with a single query.
+    """
+    serializer = FastOrderSerializer()
+    rows = serializer.get_values(queryset).iterator(chunk_size=chunk_size)
+    for chunk in chunked(rows, chunk_size):
+        yield from serializer.serialize(chunk)
+
+
+def product_lines(records):
+    for record in records:
+        yield [record[column] for column in PRODUCT_COLUMNS]
+
+
+def order_lines(records):
+    """
+    One csv line per order detail, orders without details get a single
+    line with empty detail columns.
+    """
+    for record in records:
+        order = [record[column] for column in ORDER_COLUMNS[:5]]
+        if not record['details']:
+            yield order + ['', '', '']
+        for detail in record['details']:
+            yield order + [detail['id'], detail['product'], detail['cuantity']]
+
+
+def stream_ndjson(records):
+    for record in records:
+        yield json.dumps(record, cls=JSONEncoder) + '\n'
+
+
+def stream_csv(columns, lines):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for line in lines:
+        yield writer.writerow(line)
+
+
+def export_response(request, name, records, columns, to_lines):
+    renderer = request.accepted_renderer
+    if renderer.format == 'csv':
+        content = stream_csv(columns, to_lines(records))
+    else:
+        content = stream_ndjson(records)
+
+    response = StreamingHttpResponse(
+        content,
+        content_type=f"{renderer.media_type}; charset={renderer.charset}"
+    )
+    response['Content-Disposition'] = \
+        f'attachment; filename="{name}.{renderer.format}"'
+    return response
@@ -0,0 +1,126 @@
+from abc import ABC, abstractmethod
+
+from store.exchange import get_dolar_blue
+from store.models import Order, OrderDetail
+from .serializers import ProductSerializer, OrderSerializer
+
+
+class ValuesSerializer(ABC):
+    """
+    Renders rows fetched with ``values()`` into the same shape as
+    ``serializer_class`` without building a model instance or a field
+    graph per row. Columns that need formatting reuse the declared
+    serializer fields, built once per instance. ``fields`` limits the
+    output like ``SparseFieldsMixin`` does.
+    """
+    serializer_class = None
+    values = ()
+
+    def __init__(self, fields=None):
+        self.fields = self.serializer_class(fields=fields).fields
+
+    def get_values(self, queryset):
+        return self.select_values(queryset, self.values)
+
+    @staticmethod
+    def select_values(queryset, names):
+        """
+        ``values()`` of ``names`` and of the ordering columns, which keyset
+        pagination builds its cursor from.
+        """
+        ordering = [
+            name.lstrip('-') for name in queryset.query.order_by
+            if isinstance(name, str)
+        ]
+        names = dict.fromkeys([*names, *ordering])
+        return queryset.prefetch_related(None).values(*names)
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+    @abstractmethod
+    def to_representation(self, row):
+        """
+        Output of ``serializer_class`` for a ``values()`` row.
+        """
+
+    def select(self, data):
+        if len(data) == len(self.fields):
+            return data
+        return {name: data[name] for name in self.fields}
+
+
+class FastProductSerializer(ValuesSerializer):
+    serializer_class = ProductSerializer
+    values = ('id', 'name', 'stock', 'price', 'sharded_stock', 'shards_stock')
+
+    def get_values(self, queryset):
+        if 'stock' in self.fields:
+            return super().get_values(queryset)
+        return self.select_values(queryset, ('id', 'name', 'price'))
+
+    def to_representation(self, row):
+        data = {'id': row['id'], 'name': row['name']}
+        if 'stock' in self.fields:
+            data['stock'] = row['stock']
+            if row['sharded_stock']:
+                data['stock'] = row['shards_stock'] or 0
+        if 'price' in self.fields:
+            price = self.fields['price']
+            data['price'] = price.to_representation(row['price'])
+        return self.select(data)
+
+
+class FastOrderSerializer(ValuesSerializer):
+    serializer_class = OrderSerializer
+    values = ('id', 'date_time', 'status', 'total')
+
+    def get_values(self, queryset):
+        if 'get_total_usd' in self.fields:
+            return self.select_values(
+                queryset,
+                self.values + ('exchange_rate__rate',)
+            )
+        return super().get_values(queryset)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        details = {row['id']: [] for row in rows}
+        if 'details' in self.fields:
+            self.load_details(details)
+
+        self.dolar_blue = None
+        if 'get_total_usd' in self.fields:
+            self.dolar_blue = get_dolar_blue()
+        return [
+            self.to_representation(row, details[row['id']])
+            for row in rows
+        ]
+
+    @staticmethod
+    def load_details(details):
+        detail_rows = OrderDetail.objects \
+                                 .filter(order_id__in=details) \
+                                 .order_by('id') \
+                                 .values_list(
+                                     'order_id', 'id', 'product_id', 'cuantity'
+                                 )
+        for order_id, pk, product_id, cuantity in detail_rows:
+            details[order_id].append(
+                {'id': pk, 'product': product_id, 'cuantity': cuantity}
+            )
+
+    def to_representation(self, row, details):
+        data = {'id': row['id'], 'details': details}
+        if 'date_time' in self.fields:
+            date_time = self.fields['date_time']
+            data['date_time'] = date_time.to_representation(row['date_time'])
+        data['status'] = row['status']
+        data['get_total'] = row['total']
+        if 'get_total_usd' in self.fields:
+            rate = row['exchange_rate__rate']
+            data['get_total_usd'] = Order.convert_to_usd(
+                row['total'],
+                self.dolar_blue if rate is None else rate
+            )
+        return self.select(data)
@@ -0,0 +1,290 @@
+import json
+import time
+from hashlib import sha256
+
+from django.conf import settings
+from django.http import HttpResponse, Http404
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from store.catalog import get_catalog_version, get_product_version
+from store.idempotency import get_store, get_wait_timeout
+from store.models import Order
+from .serializers import split_param
+
+
+class IdempotentMixin:
+    """
+    Create and update requests sent with an ``Idempotency-Key`` header
+    run once, retries with the same key get the stored response back and
+    concurrent duplicates wait for the request in flight to finish.
+    Keys are scoped to the user, anonymous requests cannot use them.
+    """
+    idempotency_header = 'Idempotency-Key'
+    idempotency_poll_interval = 0.1
+
+    def create(self, request, *args, **kwargs):
+        return self.run_idempotent(super().create, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self.run_idempotent(super().update, request, *args, **kwargs)
+
+    def run_idempotent(self, handler, request, *args, **kwargs):
+        header = request.headers.get(self.idempotency_header)
+        if not header:
+            return handler(request, *args, **kwargs)
+        if not request.user.is_authenticated:
+            return Response(
+                {"detail": "The Idempotency-Key header requires an "
+                           "authenticated request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        store = get_store()
+        key = self.get_idempotency_key(request, header)
+        fingerprint = self.get_request_fingerprint(request)
+        deadline = time.monotonic() + get_wait_timeout()
+        record = store.begin(key, fingerprint)
+        while record is not None and record['status_code'] is None:
+            if record['fingerprint'] != fingerprint:
+                break
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"detail": "A request with this Idempotency-Key "
+                               "is still in progress"},
+                    status=status.HTTP_409_CONFLICT
+                )
+            time.sleep(self.idempotency_poll_interval)
+            record = store.begin(key, fingerprint)
+
+        if record is not None:
+            if record['fingerprint'] != fingerprint:
+                return Response(
+                    {"detail": "This Idempotency-Key was already used "
+                               "with a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            return self.replay_response(record)
+
+        # Requests rejected with an exception did not change anything, the
+        # key is released so the client can retry them.
+        try:
+            response = handler(request, *args, **kwargs)
+        except Exception:
+            store.release(key)
+            raise
+
+        if response.status_code >= 500:
+            store.release(key)
+        else:
+            store.complete(
+                key,
+                response.status_code,
+                JSONRenderer().render(response.data).decode()
+            )
+        return response
+
+    @staticmethod
+    def get_idempotency_key(request, header):
+        scope = f"{request.user.pk}:{request.method}:{request.path}:{header}"
+        return sha256(scope.encode()).hexdigest()
+
+    @staticmethod
+    def get_request_fingerprint(request):
+        body = json.dumps(request.data, sort_keys=True, default=str)
+        return sha256(body.encode()).hexdigest()
+
+    @staticmethod
+    def replay_response(record):
+        response = HttpResponse(
+            record['response_body'],
+            status=record['status_code'],
+            content_type='application/json'
+        )
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+
+class AsyncIntakeMixin:
+    """
+    With ``ORDER_ASYNC_INTAKE`` enabled new orders are only validated
+    and stored as pending, the ``process_orders`` command reserves their
+    stock later. The response points to the order status.
+    """
+
+    def create(self, request, *args, **kwargs):
+        if not getattr(settings, 'ORDER_ASYNC_INTAKE', False):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order = Order.objects.create_pending(
+            serializer.validated_data['details']
+        )
+        status_url = reverse(
+            'store:order_status',
+            args=[order.id],
+            request=request
+        )
+        return Response(
+            {"id": order.id, "status": order.status, "status_url": status_url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': status_url}
+        )
+
+
+class CatalogConditionalGetMixin:
+    """
+    Product list and retrieve responses carry an ETag built from the
+    catalog versions, a request whose ``If-None-Match`` still matches
+    gets a 304 before any product is read. The ETag covers the negotiated
+    media type and responses vary on ``Accept``, so every representation
+    is validated on its own.
+    """
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(request, get_catalog_version())
+        return self.conditional_response(
+            request, etag, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        # "01" and "1" share the version of product 1, garbage ids never
+        # reach the shared cache.
+        try:
+            product_id = int(kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404
+        if '*' in self.get_if_none_match(request):
+            # "*" matches any current representation, a missing product
+            # has none and is still a 404.
+            self.get_object()
+        etag = self.get_etag(request, get_product_version(product_id))
+        return self.conditional_response(
+            request, etag, super().retrieve, *args, **kwargs
+        )
+
+    @staticmethod
+    def get_if_none_match(request):
+        return parse_etags(request.headers.get('If-None-Match', ''))
+
+    @staticmethod
+    def get_etag(request, version):
+        resource = (
+            f"{version}:{request.accepted_media_type}:"
+            f"{request.get_full_path()}"
+        )
+        return quote_etag(sha256(resource.encode()).hexdigest())
+
+    @classmethod
+    def conditional_response(cls, request, etag, handler, *args, **kwargs):
+        if_none_match = cls.get_if_none_match(request)
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag}
+            )
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response['ETag'] = etag
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+class SparseFieldsetsMixin:
+    """
+    ``?fields=`` limits list and retrieve responses to the named fields
+    and ``?expand=`` nests the named relations. Fields that are not
+    rendered are dropped from the serializer, ``is_requested`` lets
+    ``get_queryset`` skip loading them.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fieldset(self):
+        if self.action not in self.sparse_actions:
+            return None, set()
+
+        serializer_class = self.get_serializer_class()
+        fields = split_param(self.request.query_params.get('fields'))
+        expand = split_param(self.request.query_params.get('expand')) or []
+        errors = {}
+        unknown = set(fields or ()) - set(serializer_class.Meta.fields)
+        if unknown:
+            errors['fields'] = [
+                f"Unknown fields: {', '.join(sorted(unknown))}"
+            ]
+        unknown = set(expand) - set(serializer_class.expandable_fields)
+        if unknown:
+            errors['expand'] = [
+                f"Can not expand: {', '.join(sorted(unknown))}"
+            ]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        if fields is not None:
+            fields = set(fields) | {name.split('.')[0] for name in expand}
+        return fields, set(expand)
+
+    def is_requested(self, name):
+        fields, expand = self.get_sparse_fieldset()
+        return fields is None or name in fields
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.sparse_actions:
+            kwargs['fields'], kwargs['expand'] = self.get_sparse_fieldset()
+        return super().get_serializer(*args, **kwargs)
+
+
+class FastSerializationMixin(SparseFieldsetsMixin):
+    """
+    With ``FAST_SERIALIZATION`` enabled the ``fast_actions`` render rows
+    fetched with ``values()`` through ``fast_serializer_class`` instead
+    of the model serializer. The JSON shape is the same, expanded
+    relations still go through the model serializer.
+    """
+    fast_serializer_class = None
+    fast_actions = ('list', 'retrieve')
+
+    def use_fast_serialization(self):
+        return getattr(settings, 'FAST_SERIALIZATION', False) \
+            and self.action in self.fast_actions \
+            and not self.get_sparse_fieldset()[1]
+
+    def get_fast_serializer(self):
+        fields = self.get_sparse_fieldset()[0]
+        return self.fast_serializer_class(fields=fields)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_serialization():
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.get_fast_serializer()
+        queryset = serializer.get_values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fast_serialization():
+            return super().retrieve(request, *args, **kwargs)
+
+        serializer = self.get_fast_serializer()
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            rows = serializer.get_values(
+                queryset.filter(pk=kwargs[self.lookup_field])
+            )
+            data = serializer.serialize(rows)
+        except ValueError:
+            raise Http404
+        if not data:
+            raise Http404
+        return Response(data[0])
@@ -0,0 +1,181 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+UNIQUE_KEYS = ('id', 'pk')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination: the cursor holds the sort key of the first or last
+    row of a page and the next one is fetched with ``WHERE key > position``
+    compared over every ordering column, so a deep page costs the same as
+    the first one. ``id`` is appended to orderings that do not include it
+    so the key is unique and ties never need an OFFSET.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    ordering = ('id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_keys(request, queryset, view)
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        keys = [(name, desc != reverse) for name, desc in self.keys]
+        queryset = queryset.order_by(*[
+            f'-{name}' if desc else name for name, desc in keys
+        ])
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_position_filter(keys, position)
+            )
+
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_keys(self, request, queryset, view):
+        ordering = self.ordering
+        for backend in getattr(view, 'filter_backends', ()):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        if not any(name in UNIQUE_KEYS for name, _ in keys):
+            keys.append(('id', False))
+        return keys
+
+    @staticmethod
+    def get_position_filter(keys, position):
+        # (a, b) > (x, y) as a >= x AND (a > x OR (a = x AND b > y)), the
+        # leading bound lets the database seek the index.
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(keys, position):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        name, descending = keys[0]
+        lookup = 'lte' if descending else 'gte'
+        return Q(**{f'{name}__{lookup}': position[0]}) & condition
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        position = [
+            self.serialize_value(self.get_value(row, name))
+            for name, _ in self.keys
+        ]
+        cursor = json.dumps([position, reverse])
+        return replace_query_param(
+            remove_query_param(self.base_url, self.cursor_query_param),
+            self.cursor_query_param,
+            b64encode(cursor.encode()).decode()
+        )
+
+    def decode_cursor(self, request, model):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor is None:
+            return None, False
+        try:
+            position, reverse = json.loads(b64decode(cursor.encode()))
+            if len(position) != len(self.keys):
+                raise ValueError
+            position = [
+                self.to_python(model, name, value)
+                for (name, _), value in zip(self.keys, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(reverse)
+
+    @staticmethod
+    def get_value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    @staticmethod
+    def serialize_value(value):
+        # Full precision, a truncated datetime would skip or repeat rows.
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    @staticmethod
+    def to_python(model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+
+class ProductPagination(KeysetPagination):
+    ordering = 'id'
+
+
+class OrderPagination(KeysetPagination):
+    ordering = ('date_time', 'id')
+
+
+class SalesReportPagination(KeysetPagination):
+    ordering = ('date', 'product_id')
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Search results are sorted by rank, which is not a stable key to
+    build cursors on, so they are paginated by page number.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,46 @@
+import csv
+import json
+from io import StringIO
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders one JSON object per line. Exports stream their rows
+    themselves, this only renders the non streamed responses (errors).
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return (json.dumps(data, cls=JSONEncoder) + '\n').encode()
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders a mapping as a header row and a value row, see
+    ``NDJSONRenderer``.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict):
+            data = {'detail': data}
+
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(data.keys())
+        writer.writerow(data.values())
+        return buffer.getvalue().encode()
+
+
+EXPORT_RENDERER_CLASSES = (NDJSONRenderer, CSVRenderer)
@@ -1,19 +1,98 @@
 from django.db import transaction
 from django.core.exceptions import ValidationError
-from rest_framework import serializers
-from store.models import Product, Order, OrderDetail
+from django.shortcuts import get_object_or_404
+from rest_framework import serializers, ISO_8601
+from store.models import Product, Order, OrderDetail, ProductSale, \
+                         TopProduct
+from store.repositories import product_repository
 from store.utils import has_values
 
 
-class ProductSerializer(serializers.ModelSerializer):
+def split_param(value):
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsMixin:
+    """
+    Serializer taking ``fields``, the names to render (all of them when
+    None), and ``expand``, names from ``expandable_fields`` to nest.
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expand = set(expand)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
 
     class Meta:
         model = Product
         fields = ('id', 'name', 'stock', 'price')
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if 'stock' in data:
+            data['stock'] = instance.available_stock
+        return data
+
+    def update(self, instance, validated_data):
+        stock = None
+        if instance.sharded_stock:
+            stock = validated_data.pop('stock', None)
+
+        instance = super().update(instance, validated_data)
+        if stock is not None:
+            instance.set_stock(stock)
+        return instance
+
+
+def get_product_ids(orders):
+    product_ids = set()
+    for order in orders:
+        details = order.get('details') if isinstance(order, dict) else None
+        if not isinstance(details, list):
+            continue
+        for detail in details:
+            if not isinstance(detail, dict):
+                continue
+            try:
+                product_ids.add(int(detail.get('product')))
+            except (TypeError, ValueError):
+                pass
+    return product_ids
+
+
+class ProductPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves products from ``context['products']`` when the caller
+    already loaded them in bulk, otherwise from the product cache.
+    """
+
+    def to_internal_value(self, data):
+        products = self.context.get('products')
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            if products is None:
+                product = product_repository.get(data)
+            else:
+                product = products.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
+
 
 class OrderDetailSerializer(serializers.ModelSerializer):
-    product = serializers.PrimaryKeyRelatedField(
+    product = ProductPrimaryKeyField(
         queryset=Product.objects.all(),
         required=True
     )
@@ -26,7 +105,11 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         }
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class ExpandedOrderDetailSerializer(OrderDetailSerializer):
+    product = ProductSerializer(read_only=True)
+
+
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     details = OrderDetailSerializer(
         many=True,
         required=True,
@@ -34,11 +117,23 @@ class OrderSerializer(serializers.ModelSerializer):
     )
     get_total = serializers.ReadOnlyField()
     get_total_usd = serializers.ReadOnlyField()
+    expandable_fields = ('details.product',)
 
     class Meta:
         model = Order
-        fields = ('id', 'details', 'date_time', 'get_total', 'get_total_usd')
-        read_only_fields = ('id', 'date_time')
+        fields = (
+            'id', 'details', 'date_time', 'status',
+            'get_total', 'get_total_usd'
+        )
+        read_only_fields = ('id', 'date_time', 'status')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if 'details.product' in self.expand and 'details' in self.fields:
+            self.fields['details'] = ExpandedOrderDetailSerializer(
+                many=True,
+                read_only=True
+            )
 
     def validate_details(self, values):
         product_ids = []
@@ -59,10 +154,16 @@ class OrderSerializer(serializers.ModelSerializer):
 
     @transaction.atomic
     def create(self, validated_data):
-        order = Order.objects.create()
+        if 'exchange_rate' in self.context:
+            order = Order.objects.create(
+                exchange_rate=self.context['exchange_rate']
+            )
+        else:
+            order = Order.objects.create()
         details = validated_data.pop('details')
         try:
-            order.add_details(details)
+            with ProductSale.objects.collect():
+                order.add_details(details)
         except ValidationError as e:
             raise serializers.ValidationError({"details": e.message})
 
@@ -70,20 +171,171 @@ class OrderSerializer(serializers.ModelSerializer):
 
     @transaction.atomic
     def update(self, instance, validated_data):
+        # Locked like the cancel paths, so concurrent writes of the order
+        # read the quantities left by each other.
+        instance = get_object_or_404(
+            Order.objects.select_for_update(),
+            pk=instance.pk
+        )
+        if not instance.is_confirmed:
+            raise serializers.ValidationError(
+                {"status": f"Can not update a {instance.status} order"}
+            )
+
         input_details = validated_data.pop('details')
-        current_details = instance.details.all().select_related('product')
+        current_details = list(instance.details.all())
         details = instance.get_details_to_update_and_create(
             input_details,
             current_details
         )
 
         try:
-            instance.add_details(details['to_add'])
-            instance.update_details(details['to_update'], current_details)
+            with ProductSale.objects.collect():
+                instance.add_details(details['to_add'])
+                instance.update_details(
+                    details['to_update'],
+                    current_details
+                )
         except ValidationError as e:
             raise serializers.ValidationError({"details": e.message})
         return instance
 
 
+class OrderStatusSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Order
+        fields = ('id', 'status', 'rejection_reason')
+
+
 class StockSerializer(serializers.Serializer):
     stock = serializers.IntegerField(required=True, min_value=0)
+
+
+class DateRangeSerializer(serializers.Serializer):
+    """
+    Optional ``start`` (inclusive) and ``end`` (exclusive) bounds, as
+    ISO 8601 datetimes or plain dates.
+    """
+    start = serializers.DateTimeField(
+        required=False,
+        input_formats=[ISO_8601, '%Y-%m-%d']
+    )
+    end = serializers.DateTimeField(
+        required=False,
+        input_formats=[ISO_8601, '%Y-%m-%d']
+    )
+
+    def filter(self, queryset, field):
+        start = self.validated_data.get('start')
+        end = self.validated_data.get('end')
+        if start is not None:
+            queryset = queryset.filter(**{f'{field}__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{f'{field}__lt': end})
+        return queryset
+
+
+class SearchSerializer(serializers.Serializer):
+    q = serializers.CharField()
+
+
+def prefix_upper_bound(prefix):
+    last = ord(prefix[-1])
+    if last == 0x10ffff:
+        return None
+    return prefix[:-1] + chr(last + 1)
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    """
+    Product list filters. The ``name`` prefix is also matched as a range
+    so the name index can be used, which makes it case sensitive.
+    """
+    name = serializers.CharField(required=False)
+    name_contains = serializers.CharField(required=False)
+    price_min = serializers.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        required=False
+    )
+    price_max = serializers.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        required=False
+    )
+    in_stock = serializers.BooleanField(allow_null=True, default=None)
+
+    def filter(self, queryset):
+        data = self.validated_data
+        name = data.get('name')
+        if name:
+            queryset = queryset.filter(name__gte=name, name__startswith=name)
+            upper_bound = prefix_upper_bound(name)
+            if upper_bound is not None:
+                queryset = queryset.filter(name__lt=upper_bound)
+        if data.get('name_contains'):
+            queryset = queryset.filter(
+                name__icontains=data['name_contains']
+            )
+        if data.get('price_min') is not None:
+            queryset = queryset.filter(price__gte=data['price_min'])
+        if data.get('price_max') is not None:
+            queryset = queryset.filter(price__lte=data['price_max'])
+        if data['in_stock'] is not None:
+            condition = Product.objects.in_stock_condition()
+            queryset = queryset.filter(
+                condition if data['in_stock'] else ~condition
+            )
+        return queryset
+
+
+class ProductSaleSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ProductSale
+        fields = ('date', 'product', 'units', 'revenue')
+
+
+class SalesReportFilterSerializer(serializers.Serializer):
+    """
+    Optional ``start`` and ``end`` days (both inclusive) and ``product``,
+    a comma separated list of product ids.
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    product = serializers.CharField(required=False)
+
+    def validate_product(self, value):
+        try:
+            return [int(product_id) for product_id in split_param(value)]
+        except ValueError:
+            raise serializers.ValidationError(
+                "Expected a comma separated list of product ids"
+            )
+
+    def filter(self, queryset):
+        data = self.validated_data
+        if data.get('start') is not None:
+            queryset = queryset.filter(date__gte=data['start'])
+        if data.get('end') is not None:
+            queryset = queryset.filter(date__lte=data['end'])
+        if data.get('product'):
+            queryset = queryset.filter(product_id__in=data['product'])
+        return queryset
+
+
+class TopProductSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='product.name')
+
+    class Meta:
+        model = TopProduct
+        fields = ('product', 'name', 'units', 'revenue')
+
+
+class LeaderboardSerializer(serializers.Serializer):
+    window = serializers.ChoiceField(
+        choices=TopProduct.LEADERBOARDS,
+        default=TopProduct.HOURLY_WINDOW
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
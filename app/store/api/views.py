@@ -1,55 +1,238 @@
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.db import transaction
-from django.core.cache import cache
 
-from rest_framework import viewsets, status
+from rest_framework import viewsets, mixins, status, serializers
+from rest_framework.filters import OrderingFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from store.models import Product, Order, OrderDetail
-from store.services import get_dollar_blue
-from store.utils import select_for_update
-from .serializers import ProductSerializer, OrderSerializer, StockSerializer
+from store.models import Product, Order, OrderDetail, ProductSale, \
+                         TopProduct, ExchangeRate
+from store.repositories import product_repository
+from store.search import search_products
+from .exports import export_response, product_records, order_records, \
+                     product_lines, order_lines, PRODUCT_COLUMNS, \
+                     ORDER_COLUMNS
+from .fast_serializers import FastProductSerializer, FastOrderSerializer
+from .mixins import IdempotentMixin, AsyncIntakeMixin, \
+                    CatalogConditionalGetMixin, FastSerializationMixin
+from .pagination import ProductPagination, OrderPagination, \
+                        SearchPagination, SalesReportPagination
+from .parsers import NDJSONParser
+from .serializers import ProductSerializer, OrderSerializer, \
+                         OrderStatusSerializer, StockSerializer, \
+                         DateRangeSerializer, ProductFilterSerializer, \
+                         SearchSerializer, ProductSaleSerializer, \
+                         SalesReportFilterSerializer, LeaderboardSerializer, \
+                         TopProductSerializer, get_product_ids
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CatalogConditionalGetMixin, FastSerializationMixin,
+                     viewsets.ModelViewSet):
     serializer_class = ProductSerializer
-    queryset = Product.objects.all()
+    fast_serializer_class = FastProductSerializer
+    # retrieve is already served from the product cache
+    fast_actions = ('list',)
+    queryset = Product.objects.with_shards_stock()
+    pagination_class = ProductPagination
+    filter_backends = (OrderingFilter,)
+    ordering_fields = ('id', 'name', 'price', 'stock')
+    ordering = ('id',)
     # permission_classes = (IsAuthenticated,)
 
-    @transaction.atomic
+    def get_object(self):
+        if self.action != 'retrieve':
+            return super().get_object()
+
+        try:
+            product = product_repository.get(self.kwargs[self.lookup_field])
+        except ValueError:
+            product = None
+        if product is None:
+            raise Http404
+        self.check_object_permissions(self.request, product)
+        return product
+
+    def get_queryset(self):
+        queryset = Product.objects.all()
+        if self.is_requested('stock'):
+            queryset = super().get_queryset()
+
+        if self.action in ('list', 'search'):
+            filters = ProductFilterSerializer(data=self.request.query_params)
+            filters.is_valid(raise_exception=True)
+            queryset = filters.filter(queryset)
+        return queryset
+
+    def search(self, request):
+        serializer = SearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        products = search_products(
+            self.get_queryset(),
+            serializer.validated_data['q']
+        ).order_by('-search_rank', 'id')
+
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(products, request, view=self)
+        return paginator.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
+
+    def top(self, request):
+        serializer = LeaderboardSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        window = serializer.validated_data['window']
+        products = TopProduct.objects.top(
+            window,
+            serializer.validated_data['limit']
+        )
+        return Response({
+            "window": window,
+            "results": TopProductSerializer(products, many=True).data
+        })
+
+    def cache_stats(self, request):
+        return Response(product_repository.stats())
+
+    def export(self, request):
+        products = Product.objects.with_shards_stock().order_by('id')
+        return export_response(
+            request,
+            'products',
+            product_records(products),
+            PRODUCT_COLUMNS,
+            product_lines
+        )
+
     def set_stock(self, request, pk):
-        stock = request.data.get('stock')
         serializer = StockSerializer(data=request.data)
         if serializer.is_valid():
-            product = select_for_update(Product, pk)
-            product.set_stock(stock)
+            stock = serializer.validated_data['stock']
+            if not Product.objects.set_stock(pk, stock):
+                raise Http404
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(IdempotentMixin, AsyncIntakeMixin, FastSerializationMixin,
+                   viewsets.ModelViewSet):
     serializer_class = OrderSerializer
+    fast_serializer_class = FastOrderSerializer
     queryset = Order.objects.all()
+    pagination_class = OrderPagination
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + [NDJSONParser]
+    bulk_chunk_size = 100
     # permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        dolar_blue = cache.get("dolar_blue")
-        if dolar_blue is None:
-            response = get_dollar_blue()
-            if response:
-                dolar_blue = response['casa']['compra']
-            cache.set("dolar_blue", dolar_blue)
-
-        return self.queryset
+        if self.action not in ('list', 'retrieve'):
+            return self.queryset
+        queryset = self.queryset
+        if 'details.product' in self.get_sparse_fieldset()[1]:
+            queryset = Order.objects.with_detail_products()
+        elif self.is_requested('details'):
+            queryset = Order.objects.with_details()
+        if self.is_requested('get_total_usd'):
+            # One instance per distinct rate, shared by its orders.
+            queryset = queryset.prefetch_related('exchange_rate')
+        return queryset
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        instance.delete_details()
-        return super(OrderViewSet, self).destroy(request, *args, **kwargs)
+        try:
+            instance.delete_details()
+        except Order.DoesNotExist:
+            # Cancelled by a concurrent request meanwhile.
+            raise Http404
+        self.perform_destroy(instance)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @transaction.atomic
     def delete_detail(self, request, pk, detail_id):
-        detail = get_object_or_404(OrderDetail, pk=detail_id)
-        detail.restore_stock()
+        # The order is locked before the detail is read, so a concurrent
+        # delete of the same detail finds it gone and a worker can not
+        # confirm the order meanwhile.
+        order = get_object_or_404(Order.objects.select_for_update(), pk=pk)
+        detail = get_object_or_404(
+            OrderDetail.objects.select_related('product'),
+            pk=detail_id,
+            order_id=order.pk
+        )
+        detail.order = order
+        if order.is_confirmed:
+            detail.restore_stock()
+            ProductSale.objects.record(order.get_sales(
+                [detail.as_detail()],
+                -1
+            ))
+        order.add_to_totals(-detail.get_cost(), -1)
         detail.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def order_status(self, request, pk):
+        order = get_object_or_404(Order, pk=pk)
+        return Response(OrderStatusSerializer(order).data)
+
+    def export(self, request):
+        date_range = DateRangeSerializer(data=request.query_params)
+        date_range.is_valid(raise_exception=True)
+        orders = date_range.filter(Order.objects.all(), 'date_time') \
+                           .order_by('date_time', 'id')
+        return export_response(
+            request,
+            'orders',
+            order_records(orders),
+            ORDER_COLUMNS,
+            order_lines
+        )
+
+    def bulk_create(self, request):
+        orders = request.data
+        if not isinstance(orders, list):
+            return Response(
+                {"detail": "Expected a list of orders"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = self.get_serializer_context()
+        context['products'] = product_repository.get_many(
+            get_product_ids(orders)
+        )
+        context['exchange_rate'] = ExchangeRate.objects.current()
+        results = []
+        for start in range(0, len(orders), self.bulk_chunk_size):
+            chunk = orders[start:start + self.bulk_chunk_size]
+            # The sales of the chunk are recorded together.
+            with transaction.atomic(), ProductSale.objects.collect():
+                for index, data in enumerate(chunk, start=start):
+                    results.append(
+                        self.create_bulk_order(index, data, context)
+                    )
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def create_bulk_order(index, data, context):
+        serializer = OrderSerializer(data=data, context=context)
+        if not serializer.is_valid():
+            return {"index": index, "errors": serializer.errors}
+
+        try:
+            order = serializer.save()
+        except serializers.ValidationError as e:
+            return {"index": index, "errors": e.detail}
+        return {"index": index, "id": order.id}
+
+
+class SalesReportViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    serializer_class = ProductSaleSerializer
+    queryset = ProductSale.objects.all()
+    pagination_class = SalesReportPagination
+
+    def get_queryset(self):
+        filters = SalesReportFilterSerializer(data=self.request.query_params)
+        filters.is_valid(raise_exception=True)
+        return filters.filter(self.queryset)
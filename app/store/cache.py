@@ -0,0 +1,261 @@
+"""
+Cache backend shared by every worker of a single node.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, '
+    'accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+)
+NOT_EXPIRED = '(expires IS NULL OR expires > ?)'
+
+_local_tiers = {}
+
+
+class LocalTier:
+    """
+    In-process copy of recently read entries, kept for at most
+    ``timeout`` seconds. Shared by the threads of a process.
+    """
+
+    def __init__(self, timeout, max_entries):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, expires):
+        local_expires = time.time() + self.timeout
+        if expires is not None:
+            local_expires = min(local_expires, expires)
+        with self._lock:
+            self._data[key] = (value, local_expires)
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCache(BaseCache):
+    """
+    Keeps the entries in a SQLite database in WAL mode, so the workers of
+    a node share them and readers never wait for writers. ``LOCATION`` is
+    the database path.
+
+    Entries expire on their own timeout. Over ``MAX_ENTRIES`` the expired
+    ones are deleted first and then the least recently read, the read
+    time is kept with ``access_resolution`` seconds of precision so hot
+    keys are read without writing.
+
+    With ``OPTIONS['L1_TIMEOUT']`` entries are also kept in process for
+    that many seconds (at most ``L1_MAX_ENTRIES``): writes from other
+    processes can be missed for that long, and reads served from it do
+    not count as recent for eviction. ``add`` and ``incr`` always go to
+    the database.
+    """
+    access_resolution = 1.0
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5)
+        self._local = threading.local()
+        self._tier = None
+        if options.get('L1_TIMEOUT'):
+            self._tier = _local_tiers.setdefault(self._path, LocalTier(
+                options['L1_TIMEOUT'],
+                options.get('L1_MAX_ENTRIES', 300)
+            ))
+
+    def _connection(self):
+        # One connection per thread and process, a forked worker must not
+        # reuse the connection of its parent.
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._busy_timeout,
+                isolation_level=None
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        if self._tier is not None:
+            value = self._tier.get(key)
+            if value is not None:
+                return pickle.loads(value)
+
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            f'SELECT value, expires, accessed FROM cache '
+            f'WHERE key = ? AND {NOT_EXPIRED}',
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        if accessed < now - self.access_resolution:
+            connection.execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                (now, key)
+            )
+        if self._tier is not None:
+            self._tier.set(key, value, expires)
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write(key, value, timeout, upsert='')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        # Only an expired entry is replaced, atomically for every process.
+        return self._write(key, value, timeout, upsert=(
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?'
+        ))
+
+    def _write(self, key, value, timeout, upsert):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        connection = self._connection()
+        self._cull(connection, now)
+        params = (key, value, expires, now) + ((now,) if upsert else ())
+        cursor = connection.execute(
+            'INSERT INTO cache (key, value, expires, accessed) '
+            'VALUES (?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires, '
+            f'accessed = excluded.accessed {upsert}',
+            params
+        )
+        written = cursor.rowcount == 1
+        if self._tier is not None:
+            if written:
+                self._tier.set(key, value, expires)
+            else:
+                self._tier.delete(key)
+        return written
+
+    def _cull(self, connection, now):
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count < self._max_entries:
+            return
+        count -= connection.execute(
+            'DELETE FROM cache WHERE expires <= ?',
+            (now,)
+        ).rowcount
+        if count < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+        else:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (count // self._cull_frequency,)
+            )
+        if self._tier is not None:
+            self._tier.clear()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        cursor = self._connection().execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {NOT_EXPIRED}',
+            (expires, key, now)
+        )
+        if self._tier is not None:
+            self._tier.delete(key)
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'DELETE FROM cache WHERE key = ?',
+            (key,)
+        )
+        if self._tier is not None:
+            self._tier.delete(key)
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {NOT_EXPIRED}',
+            (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        # The write lock is taken up front so no other process can read
+        # the same value in between.
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                f'SELECT value FROM cache WHERE key = ? AND {NOT_EXPIRED}',
+                (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key)
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        if self._tier is not None:
+            self._tier.delete(key)
+        return value
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+        if self._tier is not None:
+            self._tier.clear()
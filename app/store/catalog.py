@@ -0,0 +1,58 @@
+from typing import Dict, Iterable
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+
+CATALOG_VERSION_KEY = 'catalog:version'
+PRODUCT_VERSION_KEY = 'catalog:version:product:{}'
+PRODUCT_KEY = 'product:{}:{}'
+
+
+def get_product_cache():
+    return caches[getattr(settings, 'PRODUCT_CACHE_ALIAS', 'default')]
+
+
+def get_version(key) -> str:
+    # Versions are random tokens instead of counters: if the cache loses
+    # a version the new one can never match an ETag handed out before.
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def get_catalog_version() -> str:
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def get_product_version(product_id) -> str:
+    return get_version(PRODUCT_VERSION_KEY.format(product_id))
+
+
+def get_product_versions(product_ids: Iterable) -> Dict[int, str]:
+    keys = {PRODUCT_VERSION_KEY.format(pk): pk for pk in product_ids}
+    versions = cache.get_many(keys)
+    return {
+        pk: versions.get(key) or get_version(key)
+        for key, pk in keys.items()
+    }
+
+
+def bump_catalog_version(product_ids: Iterable = ()):
+    """
+    Change the catalog version and the version of ``product_ids`` once
+    the current transaction commits. Product cache keys include the
+    product version, so every worker stops reading the old entries.
+    """
+    product_ids = list(product_ids)
+    keys = [CATALOG_VERSION_KEY] + [
+        PRODUCT_VERSION_KEY.format(product_id) for product_id in product_ids
+    ]
+
+    def bump():
+        cache.set_many({key: uuid4().hex for key in keys}, None)
+
+    transaction.on_commit(bump)
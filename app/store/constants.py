@@ -1,2 +1,3 @@
 DOLARSI_URL_API = 'https://www.dolarsi.com/api/api.php'
 DOLAR_BLUE_CODE = '310'
+DOLAR_BLUE_KEY = 'dolar_blue'
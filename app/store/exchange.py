@@ -0,0 +1,121 @@
+import logging
+import threading
+from decimal import Decimal
+from typing import Union
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, close_old_connections
+
+from store.constants import DOLAR_BLUE_KEY
+from store.models import ExchangeRate
+from store.services import get_dollar_blue
+from store.utils import convert_string_to_decimal
+
+logger = logging.getLogger(__name__)
+
+REFRESH_CLAIM_KEY = 'dolar_blue:refresh'
+DEFAULT_REFRESH_INTERVAL = 60 * 10
+DEFAULT_TIMEOUT = 5
+DEFAULT_BACKOFF = 5
+DEFAULT_MAX_BACKOFF = 60 * 10
+
+
+def get_dolar_blue() -> Union[str, Decimal, None]:
+    """
+    Last good dolar blue rate. Never calls the exchange API, the rate is
+    kept warm by ``ExchangeRateRefresher``.
+    """
+    return ExchangeRate.objects.get_cached()
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ExchangeRateRefresher:
+    """
+    Fetches the dolar blue rate every ``interval`` seconds and stores it
+    without expiry, so readers keep getting the last good rate while a
+    refresh is in flight or failing. Failed refreshes are retried with an
+    exponential backoff, every request is bounded by ``timeout``. Every
+    new rate is also stored in the ``ExchangeRate`` history.
+
+    With a shared cache only one process refreshes per interval.
+    """
+
+    def __init__(self, interval=None, timeout=None, backoff=None,
+                 max_backoff=None, url=None):
+        self.interval = interval or get_setting(
+            'EXCHANGE_RATE_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL
+        )
+        self.timeout = timeout or get_setting(
+            'EXCHANGE_RATE_TIMEOUT', DEFAULT_TIMEOUT
+        )
+        self.backoff = backoff or get_setting(
+            'EXCHANGE_RATE_BACKOFF', DEFAULT_BACKOFF
+        )
+        self.max_backoff = max_backoff or get_setting(
+            'EXCHANGE_RATE_MAX_BACKOFF', DEFAULT_MAX_BACKOFF
+        )
+        self.url = url or get_setting('EXCHANGE_RATE_URL', None)
+        self.failures = 0
+
+    def refresh(self) -> bool:
+        if not cache.add(REFRESH_CLAIM_KEY, True, self.interval):
+            return True
+
+        try:
+            house = get_dollar_blue(self.timeout, self.url)
+            rate = house['casa']['compra'] if house else None
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            logger.warning("Exchange rate refresh failed", exc_info=True)
+            rate = None
+        else:
+            if rate is None:
+                logger.warning("Exchange rate refresh failed, no rate found")
+
+        if rate is None:
+            cache.delete(REFRESH_CLAIM_KEY)
+            return False
+        cache.set(DOLAR_BLUE_KEY, rate, None)
+        try:
+            ExchangeRate.objects.record(convert_string_to_decimal(rate))
+        except DatabaseError:
+            logger.warning("Exchange rate could not be stored", exc_info=True)
+        return True
+
+    def get_delay(self, refreshed) -> float:
+        if refreshed:
+            self.failures = 0
+            return self.interval
+
+        self.failures += 1
+        return min(
+            self.backoff * 2 ** (self.failures - 1),
+            self.max_backoff
+        )
+
+    def run(self, stop=None, once=False):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            refreshed = self.refresh()
+            close_old_connections()
+            if once:
+                return refreshed
+            stop.wait(self.get_delay(refreshed))
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(
+            target=self.run,
+            name='exchange-rate-refresher',
+            daemon=True
+        )
+        thread.start()
+        return thread
+
+
+def start_refresher():
+    if get_setting('EXCHANGE_RATE_REFRESH_THREAD', False):
+        return ExchangeRateRefresher().start()
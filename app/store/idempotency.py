@@ -0,0 +1,120 @@
+from datetime import timedelta
+from typing import Dict, Union
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from store.models import IdempotencyKey
+
+DEFAULT_STORE = 'store.idempotency.DatabaseIdempotencyStore'
+DEFAULT_TTL = 60 * 60 * 24
+DEFAULT_LEASE = 60
+DEFAULT_WAIT_TIMEOUT = 10
+
+
+def get_ttl() -> int:
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL)
+
+
+def get_lease() -> int:
+    return getattr(settings, 'IDEMPOTENCY_KEY_LEASE', DEFAULT_LEASE)
+
+
+def get_wait_timeout() -> int:
+    return getattr(
+        settings,
+        'IDEMPOTENCY_WAIT_TIMEOUT',
+        DEFAULT_WAIT_TIMEOUT
+    )
+
+
+def get_store():
+    store_class = getattr(settings, 'IDEMPOTENCY_STORE', DEFAULT_STORE)
+    return import_string(store_class)()
+
+
+class DatabaseIdempotencyStore:
+    """
+    Keeps idempotency records in the ``IdempotencyKey`` table. An in
+    flight record expires after the lease so a crashed request does not
+    block its retries, a completed one is kept for the key TTL.
+    """
+
+    def begin(self, key, fingerprint) -> Union[Dict, None]:
+        """
+        Claims ``key`` and returns None, or returns the record of the
+        request that claimed it first.
+        """
+        now = timezone.now()
+        IdempotencyKey.objects.filter(key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=get_lease())
+                )
+        except IntegrityError:
+            return self.get(key)
+        return None
+
+    def get(self, key) -> Union[Dict, None]:
+        record = IdempotencyKey.objects \
+                               .filter(key=key) \
+                               .filter(expires_at__gt=timezone.now()) \
+                               .first()
+        if record is None:
+            return None
+        return {
+            'fingerprint': record.fingerprint,
+            'status_code': record.status_code,
+            'response_body': record.response_body,
+        }
+
+    def complete(self, key, status_code, response_body):
+        IdempotencyKey.objects.filter(key=key).update(
+            status_code=status_code,
+            response_body=response_body,
+            expires_at=timezone.now() + timedelta(seconds=get_ttl())
+        )
+
+    def release(self, key):
+        IdempotencyKey.objects.filter(key=key).delete()
+
+
+class CacheIdempotencyStore:
+    """
+    Keeps idempotency records in the default cache, ``cache.add`` is
+    used to claim a key so only one request can own it.
+    """
+    prefix = 'idempotency'
+
+    def get_cache_key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def begin(self, key, fingerprint) -> Union[Dict, None]:
+        record = {
+            'fingerprint': fingerprint,
+            'status_code': None,
+            'response_body': None,
+        }
+        if cache.add(self.get_cache_key(key), record, get_lease()):
+            return None
+        return self.get(key)
+
+    def get(self, key) -> Union[Dict, None]:
+        return cache.get(self.get_cache_key(key))
+
+    def complete(self, key, status_code, response_body):
+        record = self.get(key) or {}
+        record.update({
+            'status_code': status_code,
+            'response_body': response_body,
+        })
+        cache.set(self.get_cache_key(key), record, get_ttl())
+
+    def release(self, key):
+        cache.delete(self.get_cache_key(key))
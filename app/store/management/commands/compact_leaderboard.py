@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.models import TopProduct
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the best-seller leaderboards from the daily sales '
+        'rollups, run it at least once a day'
+    )
+
+    def handle(self, *args, **options):
+        rows = TopProduct.objects.compact()
+        self.stdout.write(f"{rows} leaderboard rows stored")
@@ -0,0 +1,64 @@
+import time
+from multiprocessing import Process
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from store.models import Order
+
+
+def work(batch_size, poll_interval, once):
+    while True:
+        processed = Order.objects.process_pending(batch_size)
+        if processed:
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Confirm or reject pending orders in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when there are no pending orders'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when there are no pending orders left'
+        )
+
+    def handle(self, *args, **options):
+        worker_args = (
+            options['batch_size'],
+            options['poll_interval'],
+            options['once'],
+        )
+        if options['workers'] == 1:
+            work(*worker_args)
+            return
+        # Without SKIP LOCKED (SQLite) workers would block each other on
+        # the same batch instead of taking the next one.
+        if not connection.features.has_select_for_update_skip_locked:
+            raise CommandError(
+                f'{connection.vendor} does not support SKIP LOCKED, '
+                f'run a single worker'
+            )
+
+        # Each worker opens its own database connection.
+        connections.close_all()
+        workers = [
+            Process(target=work, args=worker_args)
+            for _ in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
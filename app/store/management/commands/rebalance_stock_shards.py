@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Product, StockShard
+
+
+class Command(BaseCommand):
+    help = 'Spread the stock left in the shards of each product evenly'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'product_ids',
+            nargs='*',
+            type=int,
+            help='Products to rebalance, all sharded products by default'
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.filter(sharded_stock=True)
+        if options['product_ids']:
+            products = products.filter(pk__in=options['product_ids'])
+
+        for product_id in products.values_list('pk', flat=True):
+            stock = StockShard.objects.rebalance(product_id)
+            self.stdout.write(f"Product {product_id}: {stock} in stock")
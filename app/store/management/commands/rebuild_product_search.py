@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from store.models import Product
+from store.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of the products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        products = Product.objects.order_by('pk').values_list('pk', 'name')
+        batch = []
+        indexed = 0
+        with connection.cursor() as cursor:
+            backend.create_index(cursor)
+            backend.clear(cursor)
+            for product in products.iterator(chunk_size=options['batch_size']):
+                batch.append(product)
+                if len(batch) == options['batch_size']:
+                    backend.index(cursor, batch)
+                    indexed += len(batch)
+                    batch = []
+            backend.index(cursor, batch)
+            indexed += len(batch)
+
+        self.stdout.write(f"{indexed} products indexed")
@@ -0,0 +1,105 @@
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import F, Sum, ExpressionWrapper
+from django.db.models.functions import TruncDate
+
+from store.models import Order, OrderDetail, ProductSale, TopProduct
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the sales rollups from the confirmed orders, report the '
+        'rows that drifted and store the recomputed ones'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report the drifted rollups, do not store them'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            computed = self.compute_sales(options['batch_size'])
+            stored = {
+                (sale.date, sale.product_id): sale
+                for sale in ProductSale.objects.iterator(
+                    chunk_size=options['batch_size']
+                )
+            }
+            drifted = self.compare(computed, stored)
+            if not options['verify'] and drifted:
+                self.store(computed, stored, options['batch_size'])
+                TopProduct.objects.compact()
+
+        action = 'drifted' if options['verify'] else 'fixed'
+        self.stdout.write(
+            f"{len(computed)} rollups checked, {len(drifted)} {action}"
+        )
+
+    @staticmethod
+    def compute_sales(batch_size):
+        revenue = ExpressionWrapper(
+            F('cuantity') * F('unit_price'),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2)
+        )
+        sales = OrderDetail.objects \
+                           .filter(order__status=Order.CONFIRMED) \
+                           .annotate(date=TruncDate('order__date_time')) \
+                           .values('date', 'product_id') \
+                           .annotate(units=Sum('cuantity'),
+                                     revenue=Sum(revenue)) \
+                           .order_by()
+        return {
+            (sale['date'], sale['product_id']):
+                (sale['units'], sale['revenue'])
+            for sale in sales.iterator(chunk_size=batch_size)
+        }
+
+    def compare(self, computed, stored):
+        drifted = []
+        for key in sorted(set(computed) | set(stored)):
+            units, revenue = computed.get(key, (0, 0))
+            sale = stored.get(key)
+            stored_units, stored_revenue = \
+                (sale.units, sale.revenue) if sale else (0, 0)
+            if units == stored_units and revenue == stored_revenue:
+                continue
+
+            day, product_id = key
+            self.stdout.write(
+                f"Product {product_id} on {day}: units {stored_units} != "
+                f"{units}, revenue {stored_revenue} != {revenue}"
+            )
+            drifted.append(key)
+        return drifted
+
+    @staticmethod
+    def store(computed, stored, batch_size):
+        to_update = []
+        to_create = []
+        for (day, product_id), (units, revenue) in computed.items():
+            sale = stored.pop((day, product_id), None)
+            if sale is None:
+                to_create.append(ProductSale(
+                    date=day,
+                    product_id=product_id,
+                    units=units,
+                    revenue=revenue
+                ))
+            elif sale.units != units or sale.revenue != revenue:
+                sale.units = units
+                sale.revenue = revenue
+                to_update.append(sale)
+
+        ProductSale.objects.filter(
+            pk__in=[sale.pk for sale in stored.values()]
+        ).delete()
+        ProductSale.objects.bulk_update(
+            to_update,
+            ['units', 'revenue'],
+            batch_size=batch_size
+        )
+        ProductSale.objects.bulk_create(to_create, batch_size=batch_size)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.exchange import ExchangeRateRefresher, get_dolar_blue
+
+
+class Command(BaseCommand):
+    help = (
+        'Keep the dolar blue rate warm in the cache, for deployments that '
+        'do not run the refresher thread in the web processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Refresh the rate once and exit'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Seconds between refreshes'
+        )
+
+    def handle(self, *args, **options):
+        refresher = ExchangeRateRefresher(interval=options['interval'])
+        if options['once']:
+            if not refresher.run(once=True):
+                raise CommandError('Could not refresh the exchange rate')
+            self.stdout.write(f"Dolar blue: {get_dolar_blue()}")
+            return
+
+        try:
+            refresher.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Enable or disable sharded stock counters for products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='+', type=int)
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=8,
+            help='Number of stock counters for each product'
+        )
+        parser.add_argument(
+            '--disable',
+            action='store_true',
+            help='Move the stock back into the product row'
+        )
+
+    def handle(self, *args, **options):
+        if options['shards'] < 1:
+            raise CommandError('--shards must be at least 1')
+
+        for product_id in options['product_ids']:
+            try:
+                if options['disable']:
+                    Product.objects.disable_sharded_stock(product_id)
+                    message = f"Product {product_id}: sharded stock disabled"
+                else:
+                    Product.objects.enable_sharded_stock(
+                        product_id,
+                        options['shards']
+                    )
+                    message = f"Product {product_id}: stock sharded"
+            except Product.DoesNotExist:
+                raise CommandError(f"Product {product_id} does not exist")
+
+            self.stdout.write(message)
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from store.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Compare the stored order totals with their details'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Store the recomputed totals of the orders that drifted'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        orders = Order.objects.with_computed_totals() \
+                              .order_by('pk') \
+                              .values_list(
+                                  'pk', 'total', 'line_count',
+                                  'computed_total', 'computed_line_count'
+                              )
+        drifted = []
+        checked = 0
+        for pk, total, line_count, computed_total, computed_line_count \
+                in orders.iterator(chunk_size=options['batch_size']):
+            checked += 1
+            computed_total = computed_total or 0
+            if total == computed_total and line_count == computed_line_count:
+                continue
+
+            self.stdout.write(
+                f"Order {pk}: total {total} != {computed_total}, "
+                f"lines {line_count} != {computed_line_count}"
+            )
+            drifted.append(Order(
+                pk=pk,
+                total=computed_total,
+                line_count=computed_line_count
+            ))
+
+        if options['fix'] and drifted:
+            Order.objects.bulk_update(
+                drifted,
+                ['total', 'line_count'],
+                batch_size=options['batch_size']
+            )
+
+        action = 'fixed' if options['fix'] else 'drifted'
+        self.stdout.write(f"{checked} orders checked, {len(drifted)} {action}")
@@ -1,2 +1,6 @@
 from .product import Product
+from .exchange_rate import ExchangeRate
+from .stock_shard import StockShard
 from .orders import Order, OrderDetail
+from .sales import ProductSale, HourlyProductSale, TopProduct
+from .idempotency import IdempotencyKey
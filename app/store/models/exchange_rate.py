@@ -0,0 +1,61 @@
+from decimal import Decimal
+from typing import Union
+
+from django.db import IntegrityError, models, transaction
+
+from store.constants import DOLAR_BLUE_KEY
+from store.utils import get_or_compute
+
+# Until the refresher runs the stored rate is cached for this long.
+STORED_RATE_TIMEOUT = 60
+
+
+class ExchangeRateManager(models.Manager):
+
+    def current(self):
+        return self.order_by('-sequence').first()
+
+    def current_rate(self) -> Union[Decimal, None]:
+        current = self.current()
+        return current.rate if current is not None else None
+
+    def get_cached(self) -> Union[str, Decimal, None]:
+        """
+        Dolar blue rate kept in the cache by ``ExchangeRateRefresher``.
+        Before its first refresh the latest stored rate is loaded, by one
+        caller at a time.
+        """
+        return get_or_compute(
+            DOLAR_BLUE_KEY,
+            self.current_rate,
+            STORED_RATE_TIMEOUT
+        )
+
+    def record(self, rate: Decimal):
+        """
+        Store ``rate`` unless it is already the current one. Rows are
+        numbered with a unique ``sequence``, a concurrent caller that read
+        the same current row fails to insert and checks again.
+        """
+        while True:
+            current = self.current()
+            if current is not None and current.rate == rate:
+                return current
+            sequence = current.sequence + 1 if current is not None else 1
+            try:
+                with transaction.atomic():
+                    return self.create(rate=rate, sequence=sequence)
+            except IntegrityError:
+                continue
+
+
+class ExchangeRate(models.Model):
+    """
+    Dolar blue buying rate, in effect from ``fetched_at`` until the next
+    row. Orders keep the rate in effect when they were created.
+    """
+    rate = models.DecimalField(max_digits=10, decimal_places=2)
+    sequence = models.PositiveIntegerField(unique=True)
+    fetched_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = ExchangeRateManager()
@@ -0,0 +1,9 @@
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(max_length=255, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.TextField(null=True)
+    expires_at = models.DateTimeField()
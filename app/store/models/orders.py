@@ -1,109 +1,361 @@
+from decimal import Decimal
 from django.db import models, transaction
+from django.db.models import Sum, Count, F, ExpressionWrapper, Prefetch
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
-from django.core.cache import cache
+from django.utils import timezone
+from .exchange_rate import ExchangeRate
 from .product import Product
+from .sales import ProductSale, get_hour, merge_sales
 
-from store.utils import select_for_update, convert_string_to_decimal
+from store.utils import convert_string_to_decimal
+
+
+class OrderManager(models.Manager):
+
+    def with_details(self):
+        return self.prefetch_related('details')
+
+    def with_detail_products(self):
+        return self.prefetch_related(
+            'details',
+            Prefetch(
+                'details__product',
+                queryset=Product.objects.with_shards_stock()
+            )
+        )
+
+    def with_computed_totals(self):
+        """
+        Annotate the total and line count recomputed from the details,
+        used to verify the stored ones.
+        """
+        cost = ExpressionWrapper(
+            F('details__cuantity') * F('details__unit_price'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2)
+        )
+        return self.annotate(
+            computed_total=Sum(cost),
+            computed_line_count=Count('details')
+        )
+
+    @transaction.atomic
+    def create_pending(self, details):
+        """
+        Store an order without reserving its stock, ``process_pending``
+        confirms or rejects it later.
+        """
+        order = self.create(
+            status=Order.PENDING,
+            total=Order.get_details_cost(details),
+            line_count=len(details)
+        )
+        OrderDetail.objects.bulk_create(
+            Order.build_details(order.id, details)
+        )
+        return order
+
+    def process_pending(self, batch_size) -> int:
+        """
+        Reserve the stock of the next ``batch_size`` pending orders in a
+        single transaction. Returns the number of orders processed.
+        """
+        with transaction.atomic():
+            orders = list(
+                self.select_for_update(skip_locked=True)
+                    .filter(status=Order.PENDING)
+                    .order_by('pk')[:batch_size]
+            )
+            if not orders:
+                return 0
+
+            details = {}
+            pending_details = OrderDetail.objects \
+                                         .filter(order__in=orders) \
+                                         .select_related('product')
+            for detail in pending_details:
+                details.setdefault(detail.order_id, []).append(
+                    detail.as_detail()
+                )
+
+            self.reserve_batch(orders, details)
+        return len(orders)
+
+    def reserve_batch(self, orders, details):
+        # Try the whole batch at once first, only when some product runs
+        # out of stock the orders are reserved one by one.
+        changes = {}
+        for order in orders:
+            order_changes = Order.get_stock_changes(details.get(order.id, []))
+            for product_id, delta in order_changes.items():
+                changes[product_id] = changes.get(product_id, 0) + delta
+
+        savepoint = transaction.savepoint()
+        if not Product.objects.apply_stock_changes(changes):
+            transaction.savepoint_commit(savepoint)
+            for order in orders:
+                order.status = Order.CONFIRMED
+        else:
+            transaction.savepoint_rollback(savepoint)
+            for order in orders:
+                order.reserve_pending_details(details.get(order.id, []))
+
+        sales = {}
+        for order in orders:
+            if order.is_confirmed:
+                merge_sales(sales, order.get_sales(details.get(order.id, [])))
+        ProductSale.objects.record(sales)
+
+        self.bulk_update(
+            orders,
+            ['status', 'rejection_reason', 'total', 'line_count']
+        )
+        OrderDetail.objects.filter(
+            order__in=[order for order in orders if order.is_rejected]
+        ).delete()
 
 
 class Order(models.Model):
+    PENDING = 'pending'
+    CONFIRMED = 'confirmed'
+    REJECTED = 'rejected'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (CONFIRMED, 'Confirmed'),
+        (REJECTED, 'Rejected'),
+    )
+
     date_time = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=CONFIRMED
+    )
+    rejection_reason = models.TextField(blank=True)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    exchange_rate = models.ForeignKey(
+        ExchangeRate,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='orders'
+    )
     # user = models.ForeignKey(
     #     settings.AUTH_USER_MODEL
     # )
 
+    objects = OrderManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_time', 'id']),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Callers creating many orders resolve the rate once and assign
+        # it, even when it is None.
+        if self._state.adding and self.exchange_rate_id is None \
+                and not Order.exchange_rate.is_cached(self):
+            self.exchange_rate = ExchangeRate.objects.current()
+        super().save(*args, **kwargs)
+
+    @property
+    def is_confirmed(self):
+        return self.status == self.CONFIRMED
+
+    @property
+    def is_rejected(self):
+        return self.status == self.REJECTED
+
     @transaction.atomic
     def add_details(self, details):
-        insufficient_stock_products = []
+        if not details:
+            return
+
+        insufficient_stock_ids = Product.objects.apply_stock_changes(
+            self.get_stock_changes(details)
+        )
+        if insufficient_stock_ids:
+            self.throw_stock_error([
+                detail['product'] for detail in details
+                if detail['product'].id in insufficient_stock_ids
+            ])
+
+        OrderDetail.objects.bulk_create(
+            self.build_details(self.id, details)
+        )
+        self.add_to_totals(self.get_details_cost(details), len(details))
+        if self.is_confirmed:
+            ProductSale.objects.record(self.get_sales(details))
+
+    def add_to_totals(self, total, line_count):
+        Order.objects.filter(pk=self.pk).update(
+            total=F('total') + total,
+            line_count=F('line_count') + line_count
+        )
+        self.total = Decimal(self.total) + total
+        self.line_count += line_count
+
+    def get_sales(self, details, sign=1):
+        """
+        Units and revenue of ``details`` keyed by the hour the order was
+        created and the product, negated with ``sign=-1``.
+        """
+        hour = get_hour(self.date_time)
+        sales = {}
         for detail in details:
-            product = select_for_update(Product, detail['product'].id)
-            stock = product.stock
-            cuantity = detail['cuantity']
-            if product.check_stock(cuantity):
-                product.set_stock(abs(stock - cuantity))
-                OrderDetail.objects.create(
-                    order_id=self.id, **detail
-                )
-            else:
-                insufficient_stock_products.append(product)
+            merge_sales(sales, {(hour, detail['product'].id): (
+                sign * detail['cuantity'],
+                sign * self.get_details_cost([detail])
+            )})
+        return sales
+
+    @staticmethod
+    def get_unit_price(detail) -> Decimal:
+        # Lines already written keep the price they were written with.
+        if 'unit_price' in detail:
+            return detail['unit_price']
+        return Decimal(str(detail['product'].price))
+
+    @staticmethod
+    def get_details_cost(details):
+        return sum(
+            (
+                Order.get_unit_price(detail) * detail['cuantity']
+                for detail in details
+            ),
+            Decimal(0)
+        )
 
-        if insufficient_stock_products:
-            self.throw_stock_error(
-                insufficient_stock_products
+    @staticmethod
+    def build_details(order_id, details):
+        return [
+            OrderDetail(
+                order_id=order_id,
+                product=detail['product'],
+                cuantity=detail['cuantity'],
+                unit_price=Order.get_unit_price(detail)
             )
+            for detail in details
+        ]
 
     @staticmethod
-    def throw_stock_error(products_out_stock):
+    def get_stock_changes(details):
+        changes = {}
+        for detail in details:
+            product_id = detail['product'].id
+            changes[product_id] = changes.get(product_id, 0) \
+                - detail['cuantity']
+        return changes
+
+    def reserve_pending_details(self, details):
+        savepoint = transaction.savepoint()
+        insufficient_stock_ids = Product.objects.apply_stock_changes(
+            self.get_stock_changes(details)
+        )
+        if insufficient_stock_ids:
+            transaction.savepoint_rollback(savepoint)
+            self.status = self.REJECTED
+            self.total = 0
+            self.line_count = 0
+            self.rejection_reason = self.get_stock_error_message([
+                detail['product'] for detail in details
+                if detail['product'].id in insufficient_stock_ids
+            ])
+        else:
+            transaction.savepoint_commit(savepoint)
+            self.status = self.CONFIRMED
+
+    @staticmethod
+    def get_stock_error_message(products_out_stock):
         products_name = [product.name for product in products_out_stock]
         string_products_name = ", ".join(products_name)
         entity = 'Product'
         if len(products_name) > 1:
             entity += 's'
 
+        return f"{entity} {string_products_name} do not have enough stock"
+
+    @staticmethod
+    def throw_stock_error(products_out_stock):
         raise ValidationError(
-            f"{entity} {string_products_name} do not have enough stock"
+            Order.get_stock_error_message(products_out_stock)
         )
 
     @transaction.atomic
     def update_details(self, details_to_update, current_details):
-        insufficient_stock_products = []
+        indexed_details = self.index_details(current_details)
+        changes = {}
+        changed_details = []
+        deltas = []
         for detail in details_to_update:
-            product = select_for_update(Product, detail['product'].id)
-            stock = product.stock
-            new_cuantity = detail['cuantity']
-            current_detail = self.get_current_detail(
-                current_details,
-                product.id
-            )
-            current_cuantity = current_detail.cuantity
-            deductions = self.get_deduction(new_cuantity, current_cuantity)
-
-            if new_cuantity < current_cuantity:
-                product.set_stock(stock + deductions)
-
-            if new_cuantity > current_cuantity:
-                product.set_stock(stock - deductions)
-
-                if self.is_out_stock(deductions, stock):
-                    insufficient_stock_products.append(product)
+            product_id = detail['product'].id
+            current_detail = indexed_details[product_id]
+            delta = current_detail.cuantity - detail['cuantity']
+            if delta:
+                changes[product_id] = delta
+                deltas.append({
+                    'product': detail['product'],
+                    'cuantity': delta,
+                    'unit_price': current_detail.unit_price,
+                })
+                current_detail.cuantity = detail['cuantity']
+                changed_details.append(current_detail)
 
-            current_detail.cuantity = new_cuantity
-            current_detail.save()
+        insufficient_stock_ids = set(
+            Product.objects.apply_stock_changes(changes)
+        )
+        if insufficient_stock_ids:
+            self.throw_stock_error([
+                detail['product'] for detail in details_to_update
+                if detail['product'].id in insufficient_stock_ids
+            ])
 
-        if insufficient_stock_products:
-            self.throw_stock_error(
-                insufficient_stock_products
-            )
+        OrderDetail.objects.bulk_update(changed_details, ['cuantity'])
+        if changed_details:
+            self.add_to_totals(-self.get_details_cost(deltas), 0)
+            ProductSale.objects.record(self.get_sales(deltas, -1))
 
+    @transaction.atomic
     def delete_details(self):
-        details = self.details.all()
-        for detail in details:
-            detail.restore_stock()
-            detail.delete()
+        # Pending and rejected orders never reserved stock. The row is
+        # locked so a worker can not confirm the order meanwhile.
+        status = Order.objects.select_for_update() \
+                              .values_list('status', flat=True) \
+                              .get(pk=self.pk)
+        if status == self.CONFIRMED:
+            details = [
+                detail.as_detail()
+                for detail in self.details.select_related('product')
+            ]
+            changes = self.get_stock_changes(details)
+            Product.objects.increase_stocks({
+                product_id: -delta for product_id, delta in changes.items()
+            })
+            ProductSale.objects.record(self.get_sales(details, -1))
+        self.details.all().delete()
+        Order.objects.filter(pk=self.pk).update(total=0, line_count=0)
+        self.total = 0
+        self.line_count = 0
 
     @staticmethod
     def is_out_stock(deductions, stock):
         if deductions > stock:
             return True
 
-    def get_deduction(self, new, current):
-        return abs(new - current)
-
     @staticmethod
-    def get_current_detail(current_details, product_id):
-        for detail in current_details:
-            if detail.product.id == product_id:
-                return detail
+    def index_details(current_details):
+        return {detail.product_id: detail for detail in current_details}
 
     @staticmethod
     def get_details_to_update_and_create(details, current_details):
         to_add = []
         to_update = []
-        products_ids = [detail.product.id for detail in current_details]
+        indexed_details = Order.index_details(current_details)
         for detail in details:
             product_id = detail['product'].id
-            if product_id in products_ids:
+            if product_id in indexed_details:
                 to_update.append(detail)
             else:
                 to_add.append(detail)
@@ -112,15 +364,25 @@ class Order(models.Model):
 
     @property
     def get_total(self):
-        return sum(detail.get_cost() for detail in self.details.all())
+        return self.total
 
     @property
     def get_total_usd(self):
-        total = self.get_total
-        dolar_blue = cache.get("dolar_blue")
+        # Orders created before the rate history use the current rate.
+        if self.exchange_rate_id is not None:
+            return self.convert_to_usd(self.get_total, self.exchange_rate.rate)
+        return self.convert_to_usd(
+            self.get_total,
+            ExchangeRate.objects.get_cached()
+        )
+
+    @staticmethod
+    def convert_to_usd(total, dolar_blue):
         if dolar_blue is None:
             return None
-        total_usd = total / convert_string_to_decimal(dolar_blue)
+        if isinstance(dolar_blue, str):
+            dolar_blue = convert_string_to_decimal(dolar_blue)
+        total_usd = total / dolar_blue
         return float(format(total_usd, ".2f"))
 
 
@@ -139,12 +401,23 @@ class OrderDetail(models.Model):
         default=0,
         validators=[MinValueValidator(1)]
     )
+    # Price of the product when the line was written.
+    unit_price = models.DecimalField(max_digits=7, decimal_places=2)
+
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = self.product.price
+        super().save(*args, **kwargs)
+
+    def as_detail(self):
+        return {
+            'product': self.product,
+            'cuantity': self.cuantity,
+            'unit_price': self.unit_price,
+        }
 
-    @transaction.atomic
     def restore_stock(self):
-        product = select_for_update(Product, self.product.id)
-        stock = product.stock
-        product.set_stock(stock + self.cuantity)
+        Product.objects.increase_stock(self.product_id, self.cuantity)
 
     def get_cost(self):
-        return self.product.price * self.cuantity
+        return self.unit_price * self.cuantity
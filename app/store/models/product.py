@@ -1,5 +1,144 @@
-from django.db import models
+from typing import Dict, List
+from django.db import models, transaction
+from django.db.models import F, Q, Case, When, Value, OuterRef, Subquery, \
+                             Sum
 from django.core.validators import MinValueValidator
+from .stock_shard import StockShard
+from store.catalog import bump_catalog_version
+from store.search import index_products, remove_products
+
+
+class ProductManager(models.Manager):
+
+    @staticmethod
+    def in_stock_condition() -> Q:
+        """
+        Matches products with available stock, in their own row or in any
+        of their shards. A union instead of an OR, so each side is read
+        from an index.
+        """
+        unsharded = Product.objects.filter(sharded_stock=False, stock__gt=0) \
+                                   .values('pk')
+        sharded = StockShard.objects.filter(stock__gt=0).values('product')
+        return Q(pk__in=unsharded.union(sharded))
+
+    def with_shards_stock(self):
+        shards_stock = StockShard.objects \
+                                 .filter(product=OuterRef('pk')) \
+                                 .values('product') \
+                                 .annotate(total=Sum('stock')) \
+                                 .values('total')
+        return self.annotate(shards_stock=Case(
+            When(sharded_stock=True, then=Subquery(shards_stock)),
+            default=None,
+            output_field=models.IntegerField()
+        ))
+
+    def decrease_stock(self, pk, cuantity) -> bool:
+        # The guarded UPDATE does not match sharded products, their
+        # stock is then taken from the shards.
+        updated = self.filter(pk=pk, sharded_stock=False) \
+                      .filter(stock__gte=cuantity) \
+                      .update(stock=F('stock') - cuantity)
+        if updated or StockShard.objects.take(pk, cuantity):
+            bump_catalog_version([pk])
+            return True
+        return False
+
+    def increase_stock(self, pk, cuantity) -> bool:
+        updated = self.filter(pk=pk, sharded_stock=False) \
+                      .update(stock=F('stock') + cuantity)
+        if updated or StockShard.objects.give(pk, cuantity):
+            bump_catalog_version([pk])
+            return True
+        return False
+
+    def increase_stocks(self, changes: Dict[int, int]) -> int:
+        """
+        Give back stock to several products with a single UPDATE,
+        ``changes`` maps each product id to the cuantity to add.
+        """
+        if not changes:
+            return 0
+
+        bump_catalog_version(changes)
+        cuantity = Case(
+            *[When(pk=pk, then=Value(value)) for pk, value in changes.items()],
+            default=Value(0),
+            output_field=models.IntegerField()
+        )
+        updated = self.filter(pk__in=changes, sharded_stock=False) \
+                      .update(stock=F('stock') + cuantity)
+        if updated == len(changes):
+            return updated
+
+        sharded_ids = self.filter(pk__in=changes, sharded_stock=True) \
+                          .values_list('pk', flat=True)
+        for pk in sharded_ids:
+            updated += StockShard.objects.give(pk, changes[pk])
+        return updated
+
+    def set_stock(self, pk, new_value) -> bool:
+        updated = self.filter(pk=pk, sharded_stock=False) \
+                      .update(stock=new_value)
+        if updated or StockShard.objects.fill(pk, new_value):
+            bump_catalog_version([pk])
+            return True
+        return False
+
+    def apply_stock_changes(self, changes: Dict[int, int]) -> List[int]:
+        """
+        Apply a stock delta per product id, negative deltas take stock
+        and positive ones give it back. Returns the ids of the products
+        that did not have enough stock, the caller is expected to run
+        inside a transaction and roll back when the list is not empty.
+        Decrements are applied one guarded UPDATE per product in primary
+        key order so concurrent orders can not deadlock on the row locks,
+        increments go together in a single UPDATE.
+        """
+        insufficient_stock_ids = []
+        for pk in sorted(changes):
+            delta = changes[pk]
+            if delta < 0 and not self.decrease_stock(pk, -delta):
+                insufficient_stock_ids.append(pk)
+
+        self.increase_stocks({
+            pk: delta for pk, delta in changes.items() if delta > 0
+        })
+        return insufficient_stock_ids
+
+    @transaction.atomic
+    def enable_sharded_stock(self, pk, shards):
+        """
+        Move the stock of a product into ``shards`` counter rows so
+        concurrent orders decrement different rows.
+        """
+        product = self.select_for_update().get(pk=pk)
+        if product.sharded_stock:
+            return product
+
+        StockShard.objects.bulk_create([
+            StockShard(product=product, index=index, stock=stock)
+            for index, stock in enumerate(
+                StockShard.objects.split(product.stock, shards)
+            )
+        ])
+        product.stock = 0
+        product.sharded_stock = True
+        product.save(update_fields=['stock', 'sharded_stock'])
+        return product
+
+    @transaction.atomic
+    def disable_sharded_stock(self, pk):
+        product = self.select_for_update().get(pk=pk)
+        if not product.sharded_stock:
+            return product
+
+        product.stock = StockShard.objects.rebalance(pk)
+        product.sharded_stock = False
+        product.save(update_fields=['stock', 'sharded_stock'])
+        product.stock_shards.all().delete()
+        return product
 
 
 class Product(models.Model):
@@ -13,11 +152,43 @@ class Product(models.Model):
         default=0,
         validators=[MinValueValidator(0)]
     )
+    sharded_stock = models.BooleanField(default=False)
+
+    objects = ProductManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name']),
+            models.Index(fields=['price']),
+            models.Index(fields=['stock']),
+            models.Index(fields=['sharded_stock', 'stock']),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'name' in update_fields:
+            index_products([(self.pk, self.name)])
+        bump_catalog_version([self.pk])
+
+    def delete(self, *args, **kwargs):
+        bump_catalog_version([self.pk])
+        remove_products([self.pk])
+        return super().delete(*args, **kwargs)
+
+    @property
+    def available_stock(self):
+        if not self.sharded_stock:
+            return self.stock
+        if hasattr(self, 'shards_stock'):
+            return self.shards_stock or 0
+        return StockShard.objects.total_stock(self.pk)
 
     def set_stock(self, new_value):
-        self.stock = new_value
-        self.save()
+        Product.objects.set_stock(self.pk, new_value)
+        if not self.sharded_stock:
+            self.stock = new_value
 
     def check_stock(self, cuantity):
-        if cuantity <= self.stock:
+        if cuantity <= self.available_stock:
             return True
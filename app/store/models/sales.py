@@ -0,0 +1,277 @@
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Tuple
+
+from django.db import connections, models, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .product import Product
+
+# Keyed by the day, or by the hour (a datetime) of the sales, and the
+# product id.
+Sales = Dict[Tuple[date, int], Tuple[int, Decimal]]
+
+_collected = threading.local()
+
+
+def merge_sales(sales: Sales, other: Sales) -> Sales:
+    for key, (units, revenue) in other.items():
+        current_units, current_revenue = sales.get(key, (0, Decimal(0)))
+        sales[key] = (current_units + units, current_revenue + revenue)
+    return sales
+
+
+def get_hour(moment: datetime) -> datetime:
+    """
+    Start of the local hour of ``moment``.
+    """
+    if timezone.is_aware(moment):
+        moment = timezone.localtime(moment)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def increment(manager, key_fields, value_fields, deltas, batch_size=500):
+    """
+    Add each tuple of ``deltas`` (keyed by a tuple of ``key_fields``
+    values) to the ``value_fields`` of its row, creating the missing
+    rows. A single ``INSERT ... ON CONFLICT DO UPDATE`` per ``batch_size``
+    keys, ``key_fields`` have to be unique together.
+    """
+    deltas = [key + values for key, values in deltas.items() if any(values)]
+    if not deltas:
+        return
+
+    connection = connections[manager.db]
+    quote = connection.ops.quote_name
+    table = quote(manager.model._meta.db_table)
+    fields = [
+        manager.model._meta.get_field(name)
+        for name in key_fields + value_fields
+    ]
+    columns = [quote(field.column) for field in fields]
+    updates = ', '.join(
+        f'{column} = {table}.{column} + excluded.{column}'
+        for column in columns[len(key_fields):]
+    )
+    row = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    with connection.cursor() as cursor:
+        for start in range(0, len(deltas), batch_size):
+            batch = deltas[start:start + batch_size]
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(columns)}) '
+                f'VALUES {", ".join([row] * len(batch))} '
+                f'ON CONFLICT ({", ".join(columns[:len(key_fields)])}) '
+                f'DO UPDATE SET {updates}',
+                [
+                    field.get_db_prep_save(value, connection)
+                    for values in batch
+                    for field, value in zip(fields, values)
+                ]
+            )
+
+
+class ProductSaleManager(models.Manager):
+
+    def record(self, sales: Sales):
+        """
+        Add units and revenue to the daily rollup of each key, to the
+        hourly one when the key holds the hour of the sales, and to the
+        leaderboards covering that day. Inside ``collect`` they are only
+        added to its buffer.
+        """
+        collected = getattr(_collected, 'sales', None)
+        if collected is not None:
+            merge_sales(collected, sales)
+            return
+
+        daily = {}
+        hourly = {}
+        for (moment, product_id), values in sales.items():
+            if isinstance(moment, datetime):
+                merge_sales(hourly, {(moment, product_id): values})
+                moment = moment.date()
+            merge_sales(daily, {(moment, product_id): values})
+        increment(self, ('date', 'product_id'), ('units', 'revenue'), daily)
+        increment(
+            HourlyProductSale.objects,
+            ('hour', 'product_id'),
+            ('units', 'revenue'),
+            hourly
+        )
+        TopProduct.objects.record(daily)
+
+    @contextmanager
+    def collect(self):
+        """
+        Buffer the ``record`` calls made in the block and record them
+        together when it exits, so writing several orders costs the
+        upserts of one. Sales of a block left with an exception are
+        dropped, like the savepoint it is expected to run in. Nested
+        blocks hand their sales to the enclosing one.
+        """
+        enclosing = getattr(_collected, 'sales', None)
+        _collected.sales = {}
+        try:
+            yield
+            sales = _collected.sales
+        finally:
+            _collected.sales = enclosing
+        self.record(sales)
+
+
+class ProductSale(models.Model):
+    """
+    Units sold and revenue of a product on a day, over its confirmed
+    orders. Maintained incrementally by the order operations.
+    """
+    product = models.ForeignKey(
+        'store.Product',
+        on_delete=models.CASCADE,
+        related_name='sales'
+    )
+    date = models.DateField()
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = ProductSaleManager()
+
+    class Meta:
+        unique_together = ('date', 'product')
+
+
+class HourlyProductSale(models.Model):
+    """
+    Units sold and revenue of a product in an hour, kept for the rolling
+    24 hours leaderboard. ``TopProduct.objects.compact`` drops the hours
+    that left it.
+    """
+    product = models.ForeignKey(
+        'store.Product',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    hour = models.DateTimeField()
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('hour', 'product')
+
+
+class TopProductManager(models.Manager):
+
+    @staticmethod
+    def get_start(window, today=None) -> date:
+        today = today or timezone.localdate()
+        return today - timedelta(days=TopProduct.WINDOWS[window] - 1)
+
+    def record(self, sales: Sales):
+        starts = {
+            window: self.get_start(window) for window in self.model.WINDOWS
+        }
+        deltas = {}
+        for (day, product_id), values in sales.items():
+            for window, start in starts.items():
+                if day >= start:
+                    merge_sales(deltas, {(window, product_id): values})
+        increment(self, ('window', 'product_id'), ('units', 'revenue'), deltas)
+
+    @staticmethod
+    def get_hourly_start(now=None) -> datetime:
+        # The current hour and the 23 before.
+        now = now or timezone.now()
+        return get_hour(now - timedelta(hours=23))
+
+    def top(self, window, limit):
+        if window == self.model.HOURLY_WINDOW:
+            return self.top_hourly(limit)
+        return self.filter(window=window, units__gt=0) \
+                   .select_related('product') \
+                   .order_by('-units', 'product_id')[:limit]
+
+    def top_hourly(self, limit, now=None):
+        """
+        Leaderboard of the rolling 24 hours window, summed from the hourly
+        rollups when it is read.
+        """
+        start = self.get_hourly_start(now)
+        sales = HourlyProductSale.objects \
+                                 .filter(hour__gte=start) \
+                                 .values('product_id', 'product__name') \
+                                 .annotate(units=Sum('units'),
+                                           revenue=Sum('revenue')) \
+                                 .filter(units__gt=0) \
+                                 .order_by('-units', 'product_id')[:limit]
+        return [
+            self.model(
+                window=self.model.HOURLY_WINDOW,
+                product=Product(
+                    id=sale['product_id'],
+                    name=sale['product__name']
+                ),
+                units=sale['units'],
+                revenue=sale['revenue']
+            )
+            for sale in sales
+        ]
+
+    @transaction.atomic
+    def compact(self, today=None) -> int:
+        """
+        Recompute every window from the daily rollups, dropping the days
+        that left it, and drop the hourly rollups older than the hourly
+        window. Returns the number of rows stored.
+        """
+        HourlyProductSale.objects \
+                         .filter(hour__lt=self.get_hourly_start()) \
+                         .delete()
+        self.all().delete()
+        rows = []
+        for window in self.model.WINDOWS:
+            start = self.get_start(window, today)
+            sales = ProductSale.objects \
+                               .filter(date__gte=start) \
+                               .values('product_id') \
+                               .annotate(units=Sum('units'),
+                                         revenue=Sum('revenue')) \
+                               .filter(units__gt=0) \
+                               .order_by()
+            rows.extend(TopProduct(window=window, **sale) for sale in sales)
+        self.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+class TopProduct(models.Model):
+    """
+    Units sold and revenue of a product over the last days of each
+    window. Sales are added incrementally, ``compact`` drops the days
+    that left the window and has to run at least daily. The rolling
+    ``HOURLY_WINDOW`` is not stored, it is summed from the hourly
+    rollups.
+    """
+    HOURLY_WINDOW = '24h'
+    WINDOWS = {'7d': 7, '30d': 30}
+    LEADERBOARDS = (HOURLY_WINDOW,) + tuple(WINDOWS)
+
+    window = models.CharField(
+        max_length=3,
+        choices=[(window, window) for window in WINDOWS]
+    )
+    product = models.ForeignKey(
+        'store.Product',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    objects = TopProductManager()
+
+    class Meta:
+        unique_together = ('window', 'product')
+        indexes = [
+            models.Index(fields=['window', '-units', 'product']),
+        ]
@@ -0,0 +1,115 @@
+import random
+from typing import List
+from django.db import models, transaction
+from django.db.models import F, Sum
+from django.core.validators import MinValueValidator
+
+
+class StockShardManager(models.Manager):
+
+    @staticmethod
+    def split(stock, parts) -> List[int]:
+        size, leftover = divmod(stock, parts)
+        return [size + (1 if part < leftover else 0) for part in range(parts)]
+
+    def total_stock(self, product_id) -> int:
+        total = self.filter(product_id=product_id) \
+                    .aggregate(total=Sum('stock'))['total']
+        return total or 0
+
+    def take(self, product_id, cuantity) -> bool:
+        """
+        Take stock from a random shard that can cover the whole
+        cuantity, when none can it is spread over several shards.
+        """
+        shards = list(
+            self.filter(product_id=product_id).values_list('pk', 'stock')
+        )
+        random.shuffle(shards)
+        for pk, stock in shards:
+            if stock < cuantity:
+                continue
+            updated = self.filter(pk=pk, stock__gte=cuantity) \
+                          .update(stock=F('stock') - cuantity)
+            if updated:
+                return True
+
+        if sum(stock for _, stock in shards) < cuantity:
+            return False
+        return self.take_spread(product_id, cuantity)
+
+    @transaction.atomic
+    def take_spread(self, product_id, cuantity) -> bool:
+        shards = self.lock_shards(product_id)
+        if sum(shard.stock for shard in shards) < cuantity:
+            return False
+
+        remaining = cuantity
+        for shard in shards:
+            taken = min(shard.stock, remaining)
+            shard.stock -= taken
+            remaining -= taken
+
+        self.bulk_update(shards, ['stock'])
+        return True
+
+    def give(self, product_id, cuantity) -> bool:
+        shards = list(
+            self.filter(product_id=product_id).values_list('pk', flat=True)
+        )
+        if not shards:
+            return False
+
+        self.filter(pk=random.choice(shards)) \
+            .update(stock=F('stock') + cuantity)
+        return True
+
+    @transaction.atomic
+    def fill(self, product_id, stock) -> bool:
+        shards = self.lock_shards(product_id)
+        if not shards:
+            return False
+
+        self.distribute(shards, stock)
+        return True
+
+    @transaction.atomic
+    def rebalance(self, product_id) -> int:
+        """
+        Spread the stock left in the shards of a product evenly again,
+        returns the total stock of the product.
+        """
+        shards = self.lock_shards(product_id)
+        total = sum(shard.stock for shard in shards)
+        self.distribute(shards, total)
+        return total
+
+    def lock_shards(self, product_id):
+        return list(
+            self.select_for_update()
+                .filter(product_id=product_id)
+                .order_by('pk')
+        )
+
+    def distribute(self, shards, stock):
+        for shard, shard_stock in zip(shards, self.split(stock, len(shards))):
+            shard.stock = shard_stock
+        self.bulk_update(shards, ['stock'])
+
+
+class StockShard(models.Model):
+    product = models.ForeignKey(
+        'store.Product',
+        on_delete=models.CASCADE,
+        related_name='stock_shards'
+    )
+    index = models.PositiveSmallIntegerField()
+    stock = models.IntegerField(
+        default=0,
+        validators=[MinValueValidator(0)]
+    )
+
+    objects = StockShardManager()
+
+    class Meta:
+        unique_together = ('product', 'index')
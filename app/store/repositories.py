@@ -0,0 +1,77 @@
+from typing import Dict, Iterable, Union
+
+from django.conf import settings
+from django.core.cache import cache as shared_cache
+
+from store.catalog import (
+    PRODUCT_KEY, get_product_cache, get_product_versions
+)
+from store.models import Product
+from store.utils import count
+
+HITS_KEY = 'product_cache:hits'
+MISSES_KEY = 'product_cache:misses'
+DEFAULT_TIMEOUT = 60
+
+
+def get_product_key(product_id, version) -> str:
+    return PRODUCT_KEY.format(product_id, version)
+
+
+class ProductRepository:
+    """
+    Read-through cache of products. Keys include the product version
+    from the shared cache, which ``bump_catalog_version`` changes whenever
+    a product or its stock changes, so a worker never serves an entry
+    older than the latest write (give or take the local tier of the
+    shared cache). Stock reservations never rely on the cached stock.
+    """
+
+    def get(self, pk) -> Union[Product, None]:
+        return self.get_many([pk]).get(int(pk))
+
+    def get_many(self, pks: Iterable) -> Dict[int, Product]:
+        cache = get_product_cache()
+        versions = get_product_versions({int(pk) for pk in pks})
+        keys = {
+            get_product_key(pk, version): pk
+            for pk, version in versions.items()
+        }
+        cached = cache.get_many(keys)
+        products = {keys[key]: product for key, product in cached.items()}
+        missing = [pk for pk in keys.values() if pk not in products]
+        if missing:
+            loaded = Product.objects.with_shards_stock().in_bulk(missing)
+            cache.set_many(
+                {
+                    get_product_key(pk, versions[pk]): loaded[pk]
+                    for pk in loaded
+                },
+                self.get_timeout()
+            )
+            products.update(loaded)
+
+        self.count(HITS_KEY, len(cached))
+        self.count(MISSES_KEY, len(missing))
+        return products
+
+    @staticmethod
+    def get_timeout():
+        return getattr(settings, 'PRODUCT_CACHE_TIMEOUT', DEFAULT_TIMEOUT)
+
+    @staticmethod
+    def count(key, value):
+        # In the shared cache, so the stats cover every worker.
+        if value:
+            count(shared_cache, key, value)
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        counters = shared_cache.get_many([HITS_KEY, MISSES_KEY])
+        return {
+            'hits': counters.get(HITS_KEY, 0),
+            'misses': counters.get(MISSES_KEY, 0),
+        }
+
+
+product_repository = ProductRepository()
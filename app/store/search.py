@@ -0,0 +1,168 @@
+import re
+from typing import Iterable, List, Tuple
+
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+
+def get_terms(query: str) -> List[str]:
+    return re.findall(r'\w+', query.lower())
+
+
+class LikeSearch:
+    """
+    Fallback for databases without a full-text index, matches every term
+    as a substring of the name.
+    """
+
+    def create_index(self, cursor):
+        pass
+
+    def clear(self, cursor):
+        pass
+
+    def index(self, cursor, products: Iterable[Tuple[int, str]]):
+        pass
+
+    def remove(self, cursor, product_ids: Iterable[int]):
+        pass
+
+    def search(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(name__icontains=term)
+        return queryset.annotate(
+            search_rank=Value(1.0, output_field=FloatField())
+        )
+
+
+class SQLiteSearch(LikeSearch):
+    """
+    FTS5 table keyed by the product id, every term is matched as a
+    prefix and results are ranked with bm25.
+    """
+    table = 'store_product_fts'
+
+    def create_index(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+            f"USING fts5(name, tokenize='unicode61')"
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {self.table}")
+
+    def index(self, cursor, products):
+        products = list(products)
+        self.remove(cursor, [pk for pk, name in products])
+        cursor.executemany(
+            f"INSERT INTO {self.table} (rowid, name) VALUES (%s, %s)",
+            products
+        )
+
+    def remove(self, cursor, product_ids):
+        cursor.executemany(
+            f"DELETE FROM {self.table} WHERE rowid = %s",
+            [(pk,) for pk in product_ids]
+        )
+
+    def search(self, queryset, terms):
+        match = ' '.join(f'"{term}"*' for term in terms)
+        matches = f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s"
+        rank = (
+            f"SELECT -bm25({self.table}) FROM {self.table} "
+            f"WHERE {self.table} MATCH %s AND rowid = store_product.id"
+        )
+        return queryset.filter(pk__in=RawSQL(matches, (match,))) \
+                       .annotate(search_rank=RawSQL(
+                           rank, (match,), output_field=FloatField()
+                       ))
+
+
+class PostgreSQLSearch(LikeSearch):
+    """
+    ``tsvector`` documents in a side table with a GIN index, every term
+    is matched as a prefix and results are ranked with ts_rank.
+    """
+    table = 'store_product_search'
+
+    def create_index(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            f"product_id bigint PRIMARY KEY "
+            f"REFERENCES store_product (id) ON DELETE CASCADE, "
+            f"document tsvector NOT NULL)"
+        )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_document_idx "
+            f"ON {self.table} USING gin (document)"
+        )
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {self.table}")
+
+    def index(self, cursor, products):
+        cursor.executemany(
+            f"INSERT INTO {self.table} (product_id, document) "
+            f"VALUES (%s, to_tsvector('simple', %s)) "
+            f"ON CONFLICT (product_id) "
+            f"DO UPDATE SET document = EXCLUDED.document",
+            list(products)
+        )
+
+    def remove(self, cursor, product_ids):
+        cursor.executemany(
+            f"DELETE FROM {self.table} WHERE product_id = %s",
+            [(pk,) for pk in product_ids]
+        )
+
+    def search(self, queryset, terms):
+        query = ' & '.join(f'{term}:*' for term in terms)
+        matches = (
+            f"SELECT product_id FROM {self.table} "
+            f"WHERE document @@ to_tsquery('simple', %s)"
+        )
+        rank = (
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) "
+            f"FROM {self.table} WHERE product_id = store_product.id"
+        )
+        return queryset.filter(pk__in=RawSQL(matches, (query,))) \
+                       .annotate(search_rank=RawSQL(
+                           rank, (query,), output_field=FloatField()
+                       ))
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearch,
+    'postgresql': PostgreSQLSearch,
+}
+
+
+def get_search_backend():
+    return BACKENDS.get(connection.vendor, LikeSearch)()
+
+
+def create_search_index(**kwargs):
+    with connection.cursor() as cursor:
+        get_search_backend().create_index(cursor)
+
+
+def index_products(products: Iterable[Tuple[int, str]]):
+    with connection.cursor() as cursor:
+        get_search_backend().index(cursor, products)
+
+
+def remove_products(product_ids: Iterable[int]):
+    with connection.cursor() as cursor:
+        get_search_backend().remove(cursor, product_ids)
+
+
+def search_products(queryset, query: str):
+    """
+    Products of ``queryset`` matching every term of ``query``, annotated
+    with ``search_rank`` (higher is better).
+    """
+    terms = get_terms(query)
+    if not terms:
+        return LikeSearch().search(queryset, terms).none()
+    return get_search_backend().search(queryset, terms)
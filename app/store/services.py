@@ -3,17 +3,18 @@ from typing import List, Dict, Union
 from .constants import DOLARSI_URL_API, DOLAR_BLUE_CODE
 
 
-def get_exchange_houses() -> Union[List[Dict[str, str]], None]:
-    url = DOLARSI_URL_API + '?type=valoresprincipales'
-    response = requests.get(url)
+def get_exchange_houses(timeout=None, url=None) \
+        -> Union[List[Dict[str, str]], None]:
+    url = url or DOLARSI_URL_API + '?type=valoresprincipales'
+    response = requests.get(url, timeout=timeout)
     if response.ok:
         return response
     else:
         return None
 
 
-def get_dollar_blue() -> Union[Dict[str, str], None]:
-    response = get_exchange_houses()
+def get_dollar_blue(timeout=None, url=None) -> Union[Dict[str, str], None]:
+    response = get_exchange_houses(timeout, url)
     if response is not None:
         exchange_houses = response.json()
         for house in exchange_houses:
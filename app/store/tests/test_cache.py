@@ -0,0 +1,171 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from app.settings import BASE_DIR
+from store.cache import SQLiteCache, _local_tiers
+
+
+class SQLiteCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.addCleanup(_local_tiers.pop, self.location, None)
+        self.cache = self.get_cache()
+
+    def get_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_set_get(self):
+        self.cache.set('key', {'value': 1})
+
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', 'value')
+
+        self.assertEqual(self.get_cache().get('key'), 'value')
+
+    def test_shared_between_threads(self):
+        thread = threading.Thread(target=self.cache.set, args=('key', 1))
+        thread.start()
+        thread.join()
+
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_expired(self):
+        self.cache.set('key', 'value', 0)
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertNotIn('key', self.cache)
+
+    def test_add(self):
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.get_cache().add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+
+    def test_add_replaces_expired(self):
+        self.cache.set('key', 'first', 0)
+
+        self.assertTrue(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'second')
+
+    def test_touch(self):
+        self.cache.set('key', 'value')
+
+        self.assertTrue(self.cache.touch('key', 0))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.touch('key'))
+
+    def test_delete(self):
+        self.cache.set('key', 'value')
+
+        self.assertTrue(self.cache.delete('key'))
+        self.assertFalse(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr(self):
+        self.cache.set('key', 1)
+
+        self.assertEqual(self.cache.incr('key', 2), 3)
+        self.assertEqual(self.get_cache().get('key'), 3)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_concurrent_incr(self):
+        self.cache.set('key', 0)
+
+        def increment():
+            cache = self.get_cache()
+            for _ in range(50):
+                cache.incr('key')
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.cache.get('key'), 200)
+
+    def test_evicts_least_recently_read(self):
+        # Reads served by the local tier do not reach the database.
+        cache = self.get_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3, L1_TIMEOUT=0)
+        cache.access_resolution = 0
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        cache.get('a')
+
+        cache.set('d', 'd')
+
+        self.assertEqual(
+            cache.get_many(['a', 'b', 'c', 'd']),
+            {'a': 'a', 'c': 'c', 'd': 'd'}
+        )
+
+    def test_evicts_expired_first(self):
+        cache = self.get_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        cache.set('a', 'a')
+        cache.set('b', 'b', 0)
+        cache.set('c', 'c')
+
+        cache.set('d', 'd')
+
+        self.assertEqual(
+            cache.get_many(['a', 'b', 'c', 'd']),
+            {'a': 'a', 'c': 'c', 'd': 'd'}
+        )
+
+    def test_clear(self):
+        self.cache.set('key', 'value')
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get('key'))
+
+
+class LocalTierTests(SQLiteCacheTests):
+
+    def get_cache(self, **options):
+        options.setdefault('L1_TIMEOUT', 0.1)
+        return super().get_cache(**options)
+
+    def test_other_process_writes_seen_after_timeout(self):
+        # A cache without the local tier stands for another process.
+        other = SQLiteCache(self.location, {})
+        self.cache.set('key', 'first')
+        self.cache.get('key')
+
+        other.set('key', 'second')
+
+        self.assertEqual(self.cache.get('key'), 'first')
+        time.sleep(0.15)
+        self.assertEqual(self.cache.get('key'), 'second')
+
+    def test_own_writes_seen_immediately(self):
+        self.cache.get('key')
+        self.get_cache().set('key', 'value')
+
+        self.assertEqual(self.cache.get('key'), 'value')
+
+    def test_values_are_copies(self):
+        self.cache.set('key', [])
+        self.cache.get('key').append(1)
+
+        self.assertEqual(self.cache.get('key'), [])
+
+
+class TestCacheTests(SimpleTestCase):
+
+    def test_default_cache_is_not_the_server_one(self):
+        self.assertNotEqual(
+            str(settings.CACHES['default']['LOCATION']),
+            str(BASE_DIR / 'cache.sqlite3')
+        )
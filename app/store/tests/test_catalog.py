@@ -0,0 +1,173 @@
+from django.core.cache import cache, caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.catalog import PRODUCT_VERSION_KEY, get_catalog_version, \
+    get_product_version
+from store.models import Product, Order
+
+PRODUCT_URL = reverse('store:product-list')
+
+
+def detail_url(product_id):
+    return reverse('store:product-detail', args=[product_id])
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+class CatalogVersionTests(TestCase):
+
+    def test_version_is_stable(self):
+        self.assertEqual(get_catalog_version(), get_catalog_version())
+
+    def test_save_bumps_versions(self):
+        product = sample_product()
+        catalog_version = get_catalog_version()
+        product_version = get_product_version(product.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        self.assertNotEqual(get_catalog_version(), catalog_version)
+        self.assertNotEqual(get_product_version(product.id), product_version)
+
+    def test_stock_changes_bump_versions(self):
+        product = sample_product()
+        other = sample_product()
+        product_version = get_product_version(product.id)
+        other_version = get_product_version(other.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create().add_details(
+                [{'product': product, 'cuantity': 1}]
+            )
+
+        self.assertNotEqual(get_product_version(product.id), product_version)
+        self.assertEqual(get_product_version(other.id), other_version)
+
+    def test_failed_decrease_keeps_version(self):
+        product = sample_product(stock=1)
+        product_version = get_product_version(product.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.decrease_stock(product.id, 2)
+
+        self.assertEqual(get_product_version(product.id), product_version)
+
+
+class CatalogConditionalGetTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.client = APIClient()
+        self.product = sample_product()
+
+    def test_list_not_modified(self):
+        res = self.client.get(PRODUCT_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PRODUCT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_list_modified(self):
+        etag = self.client.get(PRODUCT_URL)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.set_stock(5)
+
+        res = self.client.get(PRODUCT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_list_etag_depends_on_query(self):
+        etag = self.client.get(PRODUCT_URL)['ETag']
+        res = self.client.get(
+            PRODUCT_URL,
+            {'page_size': 1},
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_not_modified(self):
+        url = detail_url(self.product.id)
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            sample_product()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_retrieve_modified(self):
+        url = detail_url(self.product.id)
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(
+                reverse('store:set_stock', args=[self.product.id]),
+                {'stock': 3},
+                format='json'
+            )
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['stock'], 3)
+
+    def test_retrieve_padded_id_modified(self):
+        url = reverse('store:product-list') + f'0{self.product.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.set_stock(5)
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['stock'], 5)
+
+    def test_invalid_id(self):
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIsNone(cache.get(PRODUCT_VERSION_KEY.format('abc')))
+
+    def test_missing_product_has_no_etag(self):
+        res = self.client.get(detail_url(999))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(res.has_header('ETag'))
+
+    def test_missing_product_not_matched_by_any(self):
+        res = self.client.get(detail_url(999), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_any_not_modified(self):
+        res = self.client.get(
+            detail_url(self.product.id),
+            HTTP_IF_NONE_MATCH='*'
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_etag_depends_on_media_type(self):
+        res = self.client.get(PRODUCT_URL)
+        self.assertIn('Accept', res['Vary'])
+
+        res = self.client.get(
+            PRODUCT_URL,
+            HTTP_ACCEPT='text/html',
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('Accept', res['Vary'])
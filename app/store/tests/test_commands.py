@@ -0,0 +1,51 @@
+from io import StringIO
+
+from django.test import TestCase
+from django.core.management import call_command
+
+from store.models import Product, Order
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+class VerifyOrderTotalsCommandTests(TestCase):
+
+    def setUp(self):
+        self.product = sample_product(price=10)
+        self.order = Order.objects.create()
+        self.order.add_details([{'product': self.product, 'cuantity': 2}])
+
+    def test_no_drift(self):
+        out = StringIO()
+        call_command('verify_order_totals', stdout=out)
+        self.assertIn('1 orders checked, 0 drifted', out.getvalue())
+
+    def test_price_change_is_not_drift(self):
+        Product.objects.filter(pk=self.product.pk).update(price=15)
+        out = StringIO()
+        call_command('verify_order_totals', stdout=out)
+
+        self.assertIn('1 orders checked, 0 drifted', out.getvalue())
+
+    def test_reports_drift(self):
+        Order.objects.filter(pk=self.order.pk).update(total=25)
+        out = StringIO()
+        call_command('verify_order_totals', stdout=out)
+
+        self.order.refresh_from_db()
+        self.assertIn(f"Order {self.order.id}: total 25", out.getvalue())
+        self.assertIn('1 orders checked, 1 drifted', out.getvalue())
+        self.assertEqual(self.order.total, 25)
+
+    def test_fix_drift(self):
+        Order.objects.filter(pk=self.order.pk).update(total=0, line_count=0)
+        call_command('verify_order_totals', fix=True, stdout=StringIO())
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total, 20)
+        self.assertEqual(self.order.line_count, 1)
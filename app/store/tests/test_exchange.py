@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from store.exchange import ExchangeRateRefresher, get_dolar_blue, \
+                           DOLAR_BLUE_KEY, REFRESH_CLAIM_KEY
+from store.models import ExchangeRate
+from store.tests.test_services import exchange_houses_sample
+from store.utils import COMPUTE_LOCK_KEY
+
+
+class ExchangeHousesHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the exchange rate API, answers with ``server.status``
+    and ``server.body`` after ``server.delay`` seconds.
+    """
+
+    def do_GET(self):
+        self.server.requests += 1
+        time.sleep(self.server.delay)
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(self.server.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ExchangeHousesServer(HTTPServer):
+
+    def handle_error(self, request, client_address):
+        # Clients that timed out close the connection before the answer.
+        pass
+
+
+class ExchangeRateRefresherTests(TestCase):
+
+    def setUp(self):
+        cache.delete_many([DOLAR_BLUE_KEY, REFRESH_CLAIM_KEY,
+                           COMPUTE_LOCK_KEY.format(DOLAR_BLUE_KEY)])
+        self.server = ExchangeHousesServer(
+            ('127.0.0.1', 0),
+            ExchangeHousesHandler
+        )
+        self.server.status = 200
+        self.server.body = json.dumps(exchange_houses_sample).encode()
+        self.server.delay = 0
+        self.server.requests = 0
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            args=(0.01,)
+        )
+        self.thread.start()
+        host, port = self.server.server_address
+        self.url = f'http://{host}:{port}/api'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        cache.delete_many([DOLAR_BLUE_KEY, REFRESH_CLAIM_KEY,
+                           COMPUTE_LOCK_KEY.format(DOLAR_BLUE_KEY)])
+
+    def get_refresher(self, **kwargs):
+        params = {'url': self.url, 'timeout': 0.5, 'backoff': 1}
+        params.update(kwargs)
+        return ExchangeRateRefresher(**params)
+
+    def test_refresh(self):
+        self.assertTrue(self.get_refresher().refresh())
+        self.assertEqual(get_dolar_blue(), '211,50')
+        self.assertEqual(ExchangeRate.objects.get().rate, Decimal('211.50'))
+
+    def test_refresh_records_only_rate_changes(self):
+        ExchangeRate.objects.record(Decimal('211.50'))
+
+        cache.delete(REFRESH_CLAIM_KEY)
+        self.get_refresher().refresh()
+
+        self.assertEqual(ExchangeRate.objects.count(), 1)
+
+    def test_failed_refresh_keeps_last_good_rate(self):
+        cache.set(DOLAR_BLUE_KEY, '200,00', None)
+        self.server.status = 503
+
+        with self.assertLogs('store.exchange', 'WARNING'):
+            self.assertFalse(self.get_refresher().refresh())
+
+        self.assertEqual(get_dolar_blue(), '200,00')
+        self.assertIsNone(cache.get(REFRESH_CLAIM_KEY))
+        self.assertFalse(ExchangeRate.objects.exists())
+
+    def test_invalid_response_keeps_last_good_rate(self):
+        cache.set(DOLAR_BLUE_KEY, '200,00', None)
+        self.server.body = b'<html>'
+
+        with self.assertLogs('store.exchange', 'WARNING'):
+            self.assertFalse(self.get_refresher().refresh())
+        self.assertEqual(get_dolar_blue(), '200,00')
+
+    def test_refresh_is_bounded_by_timeout(self):
+        self.server.delay = 1
+
+        start = time.monotonic()
+        with self.assertLogs('store.exchange', 'WARNING'):
+            self.assertFalse(self.get_refresher(timeout=0.1).refresh())
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_refresh_claimed_once_per_interval(self):
+        self.get_refresher().refresh()
+        self.get_refresher().refresh()
+
+        self.assertEqual(self.server.requests, 1)
+
+    def test_backoff(self):
+        refresher = self.get_refresher(interval=60, max_backoff=5)
+
+        self.assertEqual(
+            [refresher.get_delay(False) for _ in range(5)],
+            [1, 2, 4, 5, 5]
+        )
+        self.assertEqual(refresher.get_delay(True), 60)
+        self.assertEqual(refresher.get_delay(False), 1)
+
+    @patch('store.exchange.ExchangeRate.objects.record')
+    def test_background_thread_serves_stale_rate(self, mock_record):
+        # The thread writes through its own connection, outside of the
+        # test transaction, so the history is left out.
+        cache.set(DOLAR_BLUE_KEY, '200,00', None)
+        self.server.delay = 0.3
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self.get_refresher().run,
+            args=(stop,)
+        )
+        thread.start()
+
+        # The refresh is in flight, readers get the last good rate.
+        self.assertEqual(get_dolar_blue(), '200,00')
+        stop.set()
+        thread.join()
+        self.assertEqual(get_dolar_blue(), '211,50')
+
+    def test_stored_rate_until_first_refresh(self):
+        ExchangeRate.objects.record(Decimal('200.00'))
+
+        self.assertEqual(get_dolar_blue(), Decimal('200.00'))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dolar_blue(), Decimal('200.00'))
+
+        self.get_refresher().refresh()
+        self.assertEqual(get_dolar_blue(), '211,50')
+
+    def test_command_once(self):
+        out = StringIO()
+        with self.settings(EXCHANGE_RATE_URL=self.url):
+            call_command('refresh_exchange_rate', '--once', stdout=out)
+        self.assertIn('Dolar blue: 211,50', out.getvalue())
+
+    def test_command_once_fails(self):
+        self.server.status = 500
+        with self.settings(EXCHANGE_RATE_URL=self.url):
+            with self.assertRaises(CommandError):
+                call_command('refresh_exchange_rate', '--once')
+
+    @patch('store.services.requests.get')
+    def test_requests_never_fetch_the_rate(self, mock_get):
+        res = self.client.get('/api/orders/')
+
+        self.assertEqual(res.status_code, 200)
+        mock_get.assert_not_called()
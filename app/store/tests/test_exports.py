@@ -0,0 +1,156 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import caches
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.api.exports import order_records
+from store.models import Product, Order
+
+PRODUCT_EXPORT_URL = reverse('store:product_export')
+ORDER_EXPORT_URL = reverse('store:order_export')
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+def read_content(response):
+    return b''.join(response.streaming_content).decode()
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in read_content(response).splitlines()]
+
+
+def read_csv(response):
+    return list(csv.reader(StringIO(read_content(response))))
+
+
+class ExportApiTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.client = APIClient()
+        self.product1 = sample_product(name='first', price=10.5)
+        self.product2 = sample_product(name='second, sharded', stock=9)
+        Product.objects.enable_sharded_stock(self.product2.id, 3)
+        self.order = Order.objects.create()
+        self.order.add_details([
+            {'product': self.product1, 'cuantity': 2},
+            {'product': self.product2, 'cuantity': 1},
+        ])
+        self.empty_order = Order.objects.create()
+
+    def test_export_products_ndjson(self):
+        res = self.client.get(PRODUCT_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res, StreamingHttpResponse)
+        self.assertEqual(
+            res['Content-Type'],
+            'application/x-ndjson; charset=utf-8'
+        )
+        self.assertEqual(read_ndjson(res), [
+            {'id': self.product1.id, 'name': 'first', 'stock': 18,
+             'price': '10.50'},
+            {'id': self.product2.id, 'name': 'second, sharded', 'stock': 8,
+             'price': '100.00'},
+        ])
+
+    def test_export_products_csv(self):
+        res = self.client.get(PRODUCT_EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res['Content-Disposition'],
+            'attachment; filename="products.csv"'
+        )
+        self.assertEqual(read_csv(res), [
+            ['id', 'name', 'stock', 'price'],
+            [str(self.product1.id), 'first', '18', '10.50'],
+            [str(self.product2.id), 'second, sharded', '8', '100.00'],
+        ])
+
+    def test_export_orders_ndjson(self):
+        res = self.client.get(ORDER_EXPORT_URL)
+
+        orders = read_ndjson(res)
+        self.assertEqual(
+            [order['id'] for order in orders],
+            [self.order.id, self.empty_order.id]
+        )
+        self.assertEqual(orders[0]['get_total'], 121.0)
+        self.assertEqual(
+            [(detail['product'], detail['cuantity'])
+             for detail in orders[0]['details']],
+            [(self.product1.id, 2), (self.product2.id, 1)]
+        )
+        self.assertEqual(orders[1]['details'], [])
+
+    def test_export_orders_csv(self):
+        res = self.client.get(ORDER_EXPORT_URL, HTTP_ACCEPT='text/csv')
+
+        rows = read_csv(res)
+        self.assertEqual(rows[0], [
+            'id', 'date_time', 'status', 'get_total', 'get_total_usd',
+            'detail_id', 'product', 'cuantity'
+        ])
+        self.assertEqual(
+            [(row[0], row[3], row[6], row[7]) for row in rows[1:]],
+            [
+                (str(self.order.id), '121.00', str(self.product1.id), '2'),
+                (str(self.order.id), '121.00', str(self.product2.id), '1'),
+                (str(self.empty_order.id), '0.00', '', ''),
+            ]
+        )
+
+    def test_export_orders_date_range(self):
+        now = timezone.now()
+        Order.objects.filter(pk=self.order.pk) \
+                     .update(date_time=now - timedelta(days=10))
+
+        res = self.client.get(ORDER_EXPORT_URL, {
+            'start': (now - timedelta(days=1)).date().isoformat(),
+        })
+        self.assertEqual(
+            [order['id'] for order in read_ndjson(res)],
+            [self.empty_order.id]
+        )
+
+        res = self.client.get(ORDER_EXPORT_URL, {
+            'end': (now - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(
+            [order['id'] for order in read_ndjson(res)],
+            [self.order.id]
+        )
+
+    def test_export_orders_invalid_date(self):
+        res = self.client.get(ORDER_EXPORT_URL, {'start': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('start', json.loads(res.content))
+
+    def test_order_records_fetch_details_per_chunk(self):
+        for _ in range(3):
+            Order.objects.create().add_details(
+                [{'product': self.product1, 'cuantity': 1}]
+            )
+
+        with self.assertNumQueries(4):
+            records = list(order_records(Order.objects.order_by('id'), 2))
+
+        self.assertEqual(len(records), 5)
+        self.assertEqual(len(records[0]['details']), 2)
@@ -0,0 +1,108 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Product, Order, ExchangeRate
+
+PRODUCT_URL = reverse('store:product-list')
+ORDER_URL = reverse('store:order-list')
+
+
+def order_detail_url(order_id):
+    return reverse('store:order-detail', args=[order_id])
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+@patch('store.exchange.cache.get', return_value='217,50')
+class FastSerializationTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.client = APIClient()
+        self.product1 = sample_product(price=10.5)
+        self.product2 = sample_product(name='sharded', stock=9, price=3)
+        Product.objects.enable_sharded_stock(self.product2.id, 3)
+        self.orders = []
+        for cuantity in (1, 2, 3):
+            order = Order.objects.create()
+            order.add_details([
+                {'product': self.product1, 'cuantity': cuantity},
+                {'product': self.product2, 'cuantity': 1},
+            ])
+            self.orders.append(order)
+        Order.objects.create()
+
+    def assertSameResponse(self, url, params=None):
+        res = self.client.get(url, params)
+        with override_settings(FAST_SERIALIZATION=True):
+            fast_res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast_res.status_code, res.status_code)
+        self.assertEqual(fast_res.content, res.content)
+        return fast_res
+
+    def test_product_list_parity(self, mock_get):
+        self.assertSameResponse(PRODUCT_URL)
+
+    def test_narrowed_product_list_ordered_by_other_field(self, mock_get):
+        res = self.assertSameResponse(
+            PRODUCT_URL,
+            {'fields': 'id,name', 'ordering': 'stock', 'page_size': 1}
+        )
+        self.assertIsNotNone(res.data['next'])
+
+    def test_order_list_parity(self, mock_get):
+        self.assertSameResponse(ORDER_URL)
+
+    def test_paginated_order_list_parity(self, mock_get):
+        res = self.assertSameResponse(ORDER_URL, {'page_size': 2})
+        self.assertSameResponse(res.data['next'])
+
+    def test_order_retrieve_parity(self, mock_get):
+        self.assertSameResponse(order_detail_url(self.orders[1].id))
+
+    def test_order_list_parity_without_dolar_blue(self, mock_get):
+        mock_get.return_value = None
+        self.assertSameResponse(ORDER_URL)
+
+    def test_order_list_parity_with_rate_history(self, mock_get):
+        for rate in ('200.00', '210.00', '220.00'):
+            ExchangeRate.objects.record(Decimal(rate))
+            Order.objects.create().add_details([
+                {'product': self.product1, 'cuantity': 4},
+            ])
+        self.assertSameResponse(ORDER_URL)
+
+    def test_order_list_rate_queries(self, mock_get):
+        for _ in range(3):
+            Order.objects.create()
+        ExchangeRate.objects.record(Decimal('200.00'))
+        for _ in range(3):
+            Order.objects.create()
+
+        # Orders, their details and the distinct rates.
+        with self.assertNumQueries(3):
+            self.client.get(ORDER_URL)
+
+    @override_settings(FAST_SERIALIZATION=True)
+    def test_fast_order_list_queries(self, mock_get):
+        with self.assertNumQueries(2):
+            self.client.get(ORDER_URL)
+
+    @override_settings(FAST_SERIALIZATION=True)
+    def test_fast_order_retrieve_not_found(self, mock_get):
+        res = self.client.get(order_detail_url(999))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
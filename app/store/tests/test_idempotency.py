@@ -0,0 +1,157 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.core.cache import cache, caches
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Product, Order, IdempotencyKey
+from store.idempotency import DatabaseIdempotencyStore, \
+                              CacheIdempotencyStore
+
+ORDER_URL = reverse('store:order-list')
+CACHE_STORE = 'store.idempotency.CacheIdempotencyStore'
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+class IdempotencyStoreTestsMixin:
+
+    def test_begin_claims_key(self):
+        self.assertIsNone(self.store.begin('key', 'fingerprint'))
+        record = self.store.begin('key', 'fingerprint')
+        self.assertEqual(record['fingerprint'], 'fingerprint')
+        self.assertIsNone(record['status_code'])
+
+    def test_complete(self):
+        self.store.begin('key', 'fingerprint')
+        self.store.complete('key', 201, '{"id": 1}')
+        record = self.store.begin('key', 'fingerprint')
+        self.assertEqual(record['status_code'], 201)
+        self.assertEqual(record['response_body'], '{"id": 1}')
+
+    def test_release(self):
+        self.store.begin('key', 'fingerprint')
+        self.store.release('key')
+        self.assertIsNone(self.store.begin('key', 'fingerprint'))
+
+
+class DatabaseIdempotencyStoreTests(IdempotencyStoreTestsMixin, TestCase):
+
+    def setUp(self):
+        self.store = DatabaseIdempotencyStore()
+
+    @override_settings(IDEMPOTENCY_KEY_LEASE=-1)
+    def test_expired_key_can_be_claimed_again(self):
+        self.store.begin('key', 'fingerprint')
+        self.assertIsNone(self.store.begin('key', 'fingerprint'))
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+
+class CacheIdempotencyStoreTests(IdempotencyStoreTestsMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.store = CacheIdempotencyStore()
+
+
+class IdempotentOrderApiTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        caches['products'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            email='test@test.com',
+            password='testpass'
+        ))
+        self.product = sample_product(stock=10)
+        self.payload = {
+            'details': [{'product': self.product.id, 'cuantity': 2}]
+        }
+
+    def post(self, payload, key='key-1'):
+        return self.client.post(
+            ORDER_URL,
+            payload,
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def assert_replayed_once(self):
+        first = self.post(self.payload)
+        second = self.post(self.payload)
+
+        self.product.refresh_from_db()
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.product.stock, 8)
+
+    def test_retry_is_replayed(self):
+        self.assert_replayed_once()
+
+    @override_settings(IDEMPOTENCY_STORE=CACHE_STORE)
+    def test_retry_is_replayed_from_cache(self):
+        self.assert_replayed_once()
+
+    def test_different_keys_create_orders(self):
+        self.post(self.payload, key='key-1')
+        self.post(self.payload, key='key-2')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_anonymous_key_rejected(self):
+        self.client.force_authenticate(None)
+
+        res = self.post(self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_without_key_is_not_replayed(self):
+        self.client.post(ORDER_URL, self.payload, format='json')
+        self.client.post(ORDER_URL, self.payload, format='json')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_with_different_payload(self):
+        self.post(self.payload)
+        payload = {'details': [{'product': self.product.id, 'cuantity': 1}]}
+        res = self.post(payload)
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Order.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_WAIT_TIMEOUT=0)
+    def test_request_in_flight(self):
+        with patch.object(DatabaseIdempotencyStore, 'begin') as mock_begin:
+            mock_begin.return_value = {
+                'fingerprint': None,
+                'status_code': None,
+                'response_body': None,
+            }
+            with patch(
+                'store.api.mixins.IdempotentMixin.get_request_fingerprint',
+                return_value=None
+            ):
+                res = self.post(self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_rejected_request_can_be_retried(self):
+        payload = {'details': [{'product': self.product.id, 'cuantity': 50}]}
+        first = self.post(payload)
+        self.product.set_stock(100)
+        second = self.post(payload)
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 1)
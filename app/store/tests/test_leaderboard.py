@@ -0,0 +1,183 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Product, Order, ProductSale, HourlyProductSale, \
+    TopProduct
+from store.models.sales import get_hour
+
+TOP_URL = reverse('store:product_top')
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+def leaderboard(window):
+    return [
+        (top.product_id, top.units)
+        for top in TopProduct.objects.top(window, 10)
+    ]
+
+
+class TopProductTests(TestCase):
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.product1 = sample_product(price=10)
+        self.product2 = sample_product(price=1)
+
+    def test_orders_update_leaderboards(self):
+        order = Order.objects.create()
+        order.add_details([
+            {'product': self.product1, 'cuantity': 2},
+            {'product': self.product2, 'cuantity': 5},
+        ])
+        for window in TopProduct.LEADERBOARDS:
+            self.assertEqual(leaderboard(window), [
+                (self.product2.id, 5),
+                (self.product1.id, 2),
+            ])
+
+        order.delete_details()
+        self.assertEqual(leaderboard('7d'), [])
+
+    def test_large_order_updates_leaderboards(self):
+        products = [sample_product() for _ in range(340)]
+        order = Order.objects.create()
+
+        order.add_details([
+            {'product': product, 'cuantity': 1} for product in products
+        ])
+
+        self.assertEqual(TopProduct.objects.filter(units=1).count(), 680)
+        self.assertEqual(
+            HourlyProductSale.objects.filter(units=1).count(), 340
+        )
+
+    def test_sales_only_count_in_their_windows(self):
+        ProductSale.objects.record({
+            (self.today - timedelta(days=3), self.product1.id):
+                (4, Decimal('40')),
+            (self.today - timedelta(days=10), self.product2.id):
+                (9, Decimal('9')),
+        })
+
+        self.assertEqual(leaderboard('24h'), [])
+        self.assertEqual(leaderboard('7d'), [(self.product1.id, 4)])
+        self.assertEqual(leaderboard('30d'), [
+            (self.product2.id, 9),
+            (self.product1.id, 4),
+        ])
+
+    def test_compact_drops_expired_days(self):
+        ProductSale.objects.record({
+            (self.today, self.product1.id): (2, Decimal('20')),
+            (self.today - timedelta(days=6), self.product2.id):
+                (3, Decimal('3')),
+        })
+
+        TopProduct.objects.compact(today=self.today + timedelta(days=1))
+
+        self.assertEqual(leaderboard('7d'), [(self.product1.id, 2)])
+        self.assertEqual(leaderboard('30d'), [
+            (self.product2.id, 3),
+            (self.product1.id, 2),
+        ])
+
+    def test_compact_command(self):
+        ProductSale.objects.record({
+            (self.today, self.product1.id): (2, Decimal('20')),
+        })
+        TopProduct.objects.all().delete()
+        out = StringIO()
+
+        call_command('compact_leaderboard', stdout=out)
+
+        self.assertIn('2 leaderboard rows stored', out.getvalue())
+        self.assertEqual(leaderboard('7d'), [(self.product1.id, 2)])
+
+    def test_hourly_window_rolls_by_hour(self):
+        now = timezone.now()
+        ProductSale.objects.record({
+            (get_hour(now - timedelta(hours=23)), self.product1.id):
+                (2, Decimal('20')),
+            (get_hour(now - timedelta(hours=25)), self.product2.id):
+                (3, Decimal('3')),
+        })
+
+        self.assertEqual(leaderboard('24h'), [(self.product1.id, 2)])
+        self.assertEqual(leaderboard('7d'), [
+            (self.product2.id, 3),
+            (self.product1.id, 2),
+        ])
+
+    def test_compact_drops_expired_hours(self):
+        now = timezone.now()
+        ProductSale.objects.record({
+            (get_hour(now), self.product1.id): (2, Decimal('20')),
+            (get_hour(now - timedelta(days=2)), self.product2.id):
+                (3, Decimal('3')),
+        })
+
+        TopProduct.objects.compact()
+
+        self.assertEqual(
+            list(HourlyProductSale.objects.values_list('product', 'units')),
+            [(self.product1.id, 2)]
+        )
+
+
+class LeaderboardApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        today = timezone.localdate()
+        hour = get_hour(timezone.now())
+        self.products = [sample_product(name=f'p{i}') for i in range(3)]
+        ProductSale.objects.record({
+            (hour, product.id): (units, Decimal(units))
+            for product, units in zip(self.products, (1, 3, 2))
+        })
+        ProductSale.objects.record({
+            (today - timedelta(days=2), self.products[0].id):
+                (10, Decimal(10)),
+        })
+
+    def test_top_products(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(TOP_URL, {'limit': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['window'], '24h')
+        self.assertEqual(res.data['results'], [
+            {'product': self.products[1].id, 'name': 'p1', 'units': 3,
+             'revenue': '3.00'},
+            {'product': self.products[2].id, 'name': 'p2', 'units': 2,
+             'revenue': '2.00'},
+        ])
+
+    def test_top_products_window(self):
+        res = self.client.get(TOP_URL, {'window': '7d'})
+
+        self.assertEqual(
+            [(top['name'], top['units']) for top in res.data['results']],
+            [('p0', 11), ('p1', 3), ('p2', 2)]
+        )
+
+    def test_top_products_invalid_window(self):
+        res = self.client.get(TOP_URL, {'window': '1y', 'limit': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'window', 'limit'})
@@ -1,7 +1,8 @@
+from decimal import Decimal
 from unittest.mock import patch
 from django.test import TestCase
 from django.core.exceptions import ValidationError
-from store.models import Product, Order, OrderDetail
+from store.models import Product, Order, OrderDetail, ExchangeRate
 
 
 def sample_order():
@@ -18,6 +19,41 @@ def sample_product(**params):
     return Product.objects.create(**defaults)
 
 
+class ExchangeRateModelTest(TestCase):
+
+    def test_record_skips_unchanged_rate(self):
+        first = ExchangeRate.objects.record(Decimal('200.00'))
+
+        self.assertEqual(ExchangeRate.objects.record(Decimal('200.00')), first)
+        self.assertEqual(ExchangeRate.objects.count(), 1)
+
+    def test_current(self):
+        self.assertIsNone(ExchangeRate.objects.current())
+        ExchangeRate.objects.record(Decimal('200.00'))
+        rate = ExchangeRate.objects.record(Decimal('210.00'))
+
+        self.assertEqual(ExchangeRate.objects.current(), rate)
+
+    def test_record_concurrent_callers(self):
+        first = ExchangeRate.objects.record(Decimal('200.00'))
+        # Another caller stores the new rate after this one read ``first``.
+        stored = ExchangeRate.objects.record(Decimal('210.00'))
+        current = ExchangeRate.objects.current()
+        with patch.object(
+            ExchangeRate.objects,
+            'current',
+            side_effect=[first, current]
+        ):
+            self.assertEqual(
+                ExchangeRate.objects.record(Decimal('210.00')),
+                stored
+            )
+        self.assertEqual(ExchangeRate.objects.count(), 2)
+
+    def test_order_without_rate_history(self):
+        self.assertIsNone(sample_order().exchange_rate)
+
+
 class ProductModelTest(TestCase):
 
     def test_set_stock(self):
@@ -30,6 +66,61 @@ class ProductModelTest(TestCase):
         product.set_stock(new_stock)
         self.assertEqual(product.stock, 20)
 
+    def test_set_stock_only_updates_stock(self):
+        product = sample_product(stock=5)
+        Product.objects.filter(pk=product.pk).update(name="renamed")
+        product.set_stock(7)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 7)
+        self.assertEqual(product.name, "renamed")
+
+    def test_decrease_stock(self):
+        product = sample_product(stock=5)
+        self.assertTrue(Product.objects.decrease_stock(product.id, 5))
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+
+    def test_decrease_stock_insufficient(self):
+        product = sample_product(stock=5)
+        self.assertFalse(Product.objects.decrease_stock(product.id, 6))
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 5)
+
+    def test_increase_stock(self):
+        product = sample_product(stock=5)
+        self.assertTrue(Product.objects.increase_stock(product.id, 3))
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 8)
+
+    def test_increase_stocks(self):
+        product1 = sample_product(stock=5)
+        product2 = sample_product(stock=1)
+        product3 = sample_product(stock=1)
+        with self.assertNumQueries(1):
+            Product.objects.increase_stocks({product1.id: 2, product2.id: 3})
+
+        product1.refresh_from_db()
+        product2.refresh_from_db()
+        product3.refresh_from_db()
+        self.assertEqual(product1.stock, 7)
+        self.assertEqual(product2.stock, 4)
+        self.assertEqual(product3.stock, 1)
+
+    def test_apply_stock_changes(self):
+        product1 = sample_product(stock=5)
+        product2 = sample_product(stock=1)
+        product3 = sample_product(stock=0)
+        insufficient_stock_ids = Product.objects.apply_stock_changes({
+            product1.id: -2,
+            product2.id: -3,
+            product3.id: 4,
+        })
+        self.assertEqual(insufficient_stock_ids, [product2.id])
+        product1.refresh_from_db()
+        product3.refresh_from_db()
+        self.assertEqual(product1.stock, 3)
+        self.assertEqual(product3.stock, 4)
+
     def test_check_stock_invalid_cuantity(self):
         product = Product.objects.create(
             name="testproduct",
@@ -111,6 +202,57 @@ class OrderModelTest(TestCase):
         except ValidationError:
             self.assertRaises(ValidationError)
 
+    def test_add_details_invalid_keeps_stock(self):
+        product1 = sample_product(name="product 1", stock=10)
+        product2 = sample_product(name="product 2", stock=2)
+        payload = [
+            {"product": product1, "cuantity": 10},
+            {"product": product2, "cuantity": 5},
+        ]
+        order = Order.objects.create()
+        with self.assertRaises(ValidationError) as e:
+            order.add_details(payload)
+
+        product1.refresh_from_db()
+        product2.refresh_from_db()
+        self.assertEqual(
+            e.exception.message,
+            'Product product 2 do not have enough stock'
+        )
+        self.assertEqual(product1.stock, 10)
+        self.assertEqual(product2.stock, 2)
+        self.assertEqual(order.details.count(), 0)
+
+    def test_add_details_one_guarded_update_per_product(self):
+        products = [
+            sample_product(name=f"product {i}", stock=10) for i in range(30)
+        ]
+        payload = [
+            {"product": product, "cuantity": 1} for product in products
+        ]
+        order = Order.objects.create()
+        with self.assertNumQueries(len(payload) + 7):
+            order.add_details(payload)
+
+        self.assertEqual(order.details.count(), len(payload))
+        self.assertEqual(Product.objects.filter(stock=9).count(), 30)
+
+    def test_delete_details(self):
+        product1 = sample_product(name="product 1", stock=10)
+        product2 = sample_product(name="product 2", stock=10)
+        order = Order.objects.create()
+        order.add_details([
+            {"product": product1, "cuantity": 3},
+            {"product": product2, "cuantity": 5},
+        ])
+        order.delete_details()
+
+        product1.refresh_from_db()
+        product2.refresh_from_db()
+        self.assertEqual(product1.stock, 10)
+        self.assertEqual(product2.stock, 10)
+        self.assertFalse(order.details.exists())
+
     def test_is_out_stock(self):
         deductions = 25
         stock = 20
@@ -135,7 +277,7 @@ class OrderModelTest(TestCase):
             msg = 'Product product 1 do not have enough stock'
             self.assertEqual(e.message, msg)
 
-    def test_get_current_detail(self):
+    def test_index_details(self):
         product1 = sample_product(name="product 1", stock=10)
         product2 = sample_product(name="product 2", stock=10)
         payload = [
@@ -144,12 +286,27 @@ class OrderModelTest(TestCase):
         ]
         order = Order.objects.create()
         order.add_details(payload)
-        current_details = order.details.all().select_related('product')
-        detail1 = order.get_current_detail(current_details, product1.id)
-        detail2 = order.get_current_detail(current_details, product2.id)
+        current_details = order.details.all()
+        indexed_details = order.index_details(current_details)
+
+        self.assertEqual(current_details[0], indexed_details[product1.id])
+        self.assertEqual(current_details[1], indexed_details[product2.id])
 
-        self.assertEqual(current_details[0], detail1)
-        self.assertEqual(current_details[1], detail2)
+    def test_get_details_to_update_and_create(self):
+        product1 = sample_product(name="product 1", stock=10)
+        product2 = sample_product(name="product 2", stock=10)
+        order = Order.objects.create()
+        order.add_details([{"product": product1, "cuantity": 3}])
+        payload = [
+            {"product": product1, "cuantity": 1},
+            {"product": product2, "cuantity": 5},
+        ]
+        details = order.get_details_to_update_and_create(
+            payload,
+            order.details.all()
+        )
+        self.assertEqual(details['to_update'], [payload[0]])
+        self.assertEqual(details['to_add'], [payload[1]])
 
     def test_get_total(self):
         price1 = 20.00
@@ -165,7 +322,27 @@ class OrderModelTest(TestCase):
         expected_output = (price1 * 3) + (price2 * 5)
         self.assertEqual(order.get_total, expected_output)
 
-    @patch('store.models.orders.cache.get')
+    def test_totals_are_kept_in_sync(self):
+        product1 = sample_product(name="product 1", price=20.00)
+        product2 = sample_product(name="product 2", price=30.00)
+        order = Order.objects.create()
+        order.add_details([{"product": product1, "cuantity": 3}])
+        order.add_details([{"product": product2, "cuantity": 1}])
+        order.update_details(
+            [{"product": product2, "cuantity": 5}],
+            order.details.all()
+        )
+
+        order.refresh_from_db()
+        self.assertEqual(order.total, 210)
+        self.assertEqual(order.line_count, 2)
+
+        order.delete_details()
+        order.refresh_from_db()
+        self.assertEqual(order.total, 0)
+        self.assertEqual(order.line_count, 0)
+
+    @patch('store.exchange.cache.get')
     def test_get_total_usd(self, mock_get_dollar_blue):
         mock_get_dollar_blue.return_value = "217.00"
         price1 = 20.00
@@ -182,7 +359,7 @@ class OrderModelTest(TestCase):
         expected_output = float(format((total / 217.00), ".2f"))
         self.assertEqual(order.get_total_usd, expected_output)
 
-    @patch('store.models.orders.cache.get')
+    @patch('store.exchange.cache.get')
     def test_get_total_usd_invalid(self, mock_get_dollar_blue):
         mock_get_dollar_blue.return_value = None
         price1 = 20.00
@@ -197,6 +374,18 @@ class OrderModelTest(TestCase):
         order.add_details(payload)
         self.assertEqual(order.get_total_usd, None)
 
+    @patch('store.exchange.cache.get')
+    def test_get_total_usd_uses_rate_at_creation(self, mock_get_dollar_blue):
+        mock_get_dollar_blue.return_value = "100.00"
+        rate = ExchangeRate.objects.record(Decimal('200.00'))
+        order = Order.objects.create()
+        order.add_details([{"product": sample_product(), "cuantity": 2}])
+        ExchangeRate.objects.record(Decimal('250.00'))
+
+        order = Order.objects.get(pk=order.pk)
+        self.assertEqual(order.exchange_rate, rate)
+        self.assertEqual(order.get_total_usd, 0.5)
+
     def test_update_details_successful(self):
         product1 = sample_product(name="product 1", stock=10)
         product2 = sample_product(name="product 2", stock=15)
@@ -222,6 +411,46 @@ class OrderModelTest(TestCase):
         self.assertEqual(product2.stock, 5)
         self.assertEqual(product3.stock, 4)
 
+    def test_update_details_keeps_unit_price(self):
+        product = sample_product(price=10)
+        order = Order.objects.create()
+        order.add_details([{"product": product, "cuantity": 3}])
+        product.price = 40
+        product.save()
+
+        order.update_details(
+            [{"product": product, "cuantity": 1}],
+            order.details.all()
+        )
+
+        order.refresh_from_db()
+        self.assertEqual(order.details.get().unit_price, 10)
+        self.assertEqual(order.total, 10)
+
+    def test_update_details_only_writes_changes(self):
+        products = [
+            sample_product(name=f"product {i}", stock=10) for i in range(200)
+        ]
+        order = Order.objects.create()
+        order.add_details([
+            {"product": product, "cuantity": 2} for product in products
+        ])
+        payload_to_update = [
+            {"product": product, "cuantity": 2} for product in products
+        ]
+        payload_to_update[0]['cuantity'] = 5
+        payload_to_update[1]['cuantity'] = 1
+        current_details = list(order.details.all())
+        with self.assertNumQueries(9):
+            order.update_details(payload_to_update, current_details)
+
+        products[0].refresh_from_db()
+        products[1].refresh_from_db()
+        self.assertEqual(products[0].stock, 5)
+        self.assertEqual(products[1].stock, 9)
+        self.assertEqual(order.details.get(product=products[0]).cuantity, 5)
+        self.assertEqual(order.details.get(product=products[1]).cuantity, 1)
+
     def test_update_details_invalid(self):
         product = sample_product(name="product 1", stock=10)
         order = Order.objects.create()
@@ -1,17 +1,26 @@
+import json
+from decimal import Decimal
 from unittest.mock import patch
 
+from django.db import connection
+from django.db.models import Sum
+from django.core.cache import caches
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from store.models import Product, Order
+from store.models import Product, Order, OrderDetail, ExchangeRate, \
+    ProductSale
 
 from store.api.serializers import OrderSerializer
+from store.api.views import OrderViewSet
 
 ORDER_URL = reverse('store:order-list')
+BULK_ORDER_URL = reverse('store:bulk_create')
 
 
 def detail_url(order_id):
@@ -37,6 +46,7 @@ def sample_product(**params):
 class PrivateOrderApiTests(TestCase):
 
     def setUp(self):
+        caches['products'].clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
                 'test@test.com',
@@ -44,7 +54,7 @@ class PrivateOrderApiTests(TestCase):
         )
         self.client.force_authenticate(self.user)
 
-    @patch('store.api.views.cache.get')
+    @patch('store.exchange.cache.get')
     def test_retrieve_orders(self, mock_get_dollar_blue):
         mock_get_dollar_blue.return_value = '217.00'
         sample_order()
@@ -53,6 +63,75 @@ class PrivateOrderApiTests(TestCase):
         order = Order.objects.all()
         serializer = OrderSerializer(order, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    @patch('store.exchange.cache.get')
+    def test_retrieve_orders_paginated(self, mock_get_dollar_blue):
+        mock_get_dollar_blue.return_value = '217.00'
+        orders = [sample_order() for _ in range(3)]
+
+        res = self.client.get(ORDER_URL, {'page_size': 2})
+        self.assertEqual(
+            [order['id'] for order in res.data['results']],
+            [orders[0].id, orders[1].id]
+        )
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [order['id'] for order in res.data['results']],
+            [orders[2].id]
+        )
+        self.assertIsNone(res.data['next'])
+
+    @patch('store.exchange.cache.get')
+    def test_paginate_orders_created_together(self, mock_get_dollar_blue):
+        mock_get_dollar_blue.return_value = '217.00'
+        orders = [sample_order() for _ in range(3)]
+        Order.objects.update(date_time=orders[0].date_time)
+
+        res = self.client.get(ORDER_URL, {'page_size': 2})
+        res = self.client.get(res.data['next'])
+
+        self.assertEqual(
+            [order['id'] for order in res.data['results']],
+            [orders[2].id]
+        )
+
+    @patch('store.exchange.cache.get')
+    def test_list_orders_constant_queries(self, mock_get_dollar_blue):
+        mock_get_dollar_blue.return_value = '217.00'
+        products = [sample_product(stock=100) for _ in range(10)]
+
+        def create_orders(count):
+            for _ in range(count):
+                order = sample_order()
+                order.add_details([
+                    {'product': product, 'cuantity': 1}
+                    for product in products
+                ])
+
+        create_orders(1)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(ORDER_URL)
+        create_orders(20)
+
+        with self.assertNumQueries(len(context.captured_queries)):
+            res = self.client.get(ORDER_URL)
+
+        self.assertEqual(len(res.data['results']), 21)
+        self.assertEqual(res.data['results'][0]['get_total'], 1000)
+
+    @patch('store.exchange.cache.get')
+    def test_retrieve_order(self, mock_get_dollar_blue):
+        mock_get_dollar_blue.return_value = '217.00'
+        product = sample_product(price=200.00)
+        order = sample_order()
+        order.add_details([{'product': product, 'cuantity': 2}])
+
+        res = self.client.get(detail_url(order.id))
+
+        serializer = OrderSerializer(order)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
     def test_create_order_with_details(self):
@@ -86,7 +165,7 @@ class PrivateOrderApiTests(TestCase):
         order = Order.objects.get(id=res.data['id'])
         self.assertEqual(order.get_total, 500.00)
 
-    @patch('store.models.orders.cache.get')
+    @patch('store.exchange.cache.get')
     def test_order_get_total_usd(self, dolar_blue_mock):
         dolar_blue_mock.return_value = '211,00'
         sample_product(price=200.00)
@@ -116,7 +195,7 @@ class PrivateOrderApiTests(TestCase):
         res = self.client.post(ORDER_URL, payload, format='json')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
-    @patch('store.api.views.cache.get')
+    @patch('store.exchange.cache.get')
     def test_full_update_order_details(self, mock_get_dollar_blue):
         mock_get_dollar_blue.return_value = '217.00'
         product1 = sample_product(stock=10)
@@ -150,7 +229,7 @@ class PrivateOrderApiTests(TestCase):
         )
         self.assertEqual(details[2].product.stock, 4)
 
-    @patch('store.api.views.cache.get')
+    @patch('store.exchange.cache.get')
     def test_full_update_or_create_order_details(self, mock_get_dollar_blue):
         mock_get_dollar_blue.return_value = '217.00'
         product1 = sample_product(stock=10)
@@ -175,7 +254,7 @@ class PrivateOrderApiTests(TestCase):
         self.assertEqual(details[1].product.stock, 5)
         self.assertEqual(details.count(), 2)
 
-    @patch('store.api.views.cache.get')
+    @patch('store.exchange.cache.get')
     def test_full_update_order_details_product_out_stock(
         self,
         mock_get_dollar_blue
@@ -189,3 +268,233 @@ class PrivateOrderApiTests(TestCase):
         url = detail_url(order.id)
         res = self.client.put(url, payload, format='json')
         self.assertEquals(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch('store.exchange.cache.get')
+    def test_delete_order_restores_stock(self, mock_get_dollar_blue):
+        mock_get_dollar_blue.return_value = '217.00'
+        products = [sample_product(stock=10) for _ in range(200)]
+        order = sample_order()
+        order.add_details([
+            {'product': product, 'cuantity': 4} for product in products
+        ])
+
+        url = detail_url(order.id)
+        with self.assertNumQueries(15):
+            res = self.client.delete(url)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Order.objects.filter(id=order.id).exists())
+        self.assertFalse(OrderDetail.objects.filter(order=order).exists())
+        self.assertEqual(Product.objects.filter(stock=10).count(), 200)
+
+    @patch('store.exchange.cache.get')
+    def test_delete_order_detail_restores_stock(self, mock_get_dollar_blue):
+        mock_get_dollar_blue.return_value = '217.00'
+        product = sample_product(stock=10)
+        order = sample_order()
+        order.add_details([{'product': product, 'cuantity': 4}])
+        detail = order.details.get()
+
+        url = reverse('store:delete_detail', args=[order.id, detail.id])
+        res = self.client.delete(url)
+
+        product.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(product.stock, 10)
+        self.assertFalse(order.details.exists())
+        self.assertEqual(order.total, 0)
+        self.assertEqual(order.line_count, 0)
+
+    @patch('store.exchange.cache.get')
+    def test_delete_order_detail_after_price_change(self, mock_get):
+        mock_get.return_value = '217.00'
+        product1 = sample_product(price=10)
+        product2 = sample_product(price=20)
+        order = sample_order()
+        order.add_details([
+            {'product': product1, 'cuantity': 2},
+            {'product': product2, 'cuantity': 1},
+        ])
+        product1.price = 50
+        product1.save()
+        detail = order.details.get(product=product1)
+
+        url = reverse('store:delete_detail', args=[order.id, detail.id])
+        self.client.delete(url)
+
+        order.refresh_from_db()
+        self.assertEqual(order.total, 20)
+
+    def test_delete_order_detail_twice(self):
+        product = sample_product(stock=10)
+        order = sample_order()
+        order.add_details([{'product': product, 'cuantity': 4}])
+        detail = order.details.get()
+        url = reverse('store:delete_detail', args=[order.id, detail.id])
+        self.client.delete(url)
+
+        res = self.client.delete(url)
+
+        product.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(product.stock, 10)
+
+    def test_delete_order_detail_of_other_order(self):
+        product = sample_product(stock=10)
+        order = sample_order()
+        order.add_details([{'product': product, 'cuantity': 4}])
+        detail = order.details.get()
+        other = sample_order()
+
+        url = reverse('store:delete_detail', args=[other.id, detail.id])
+        res = self.client.delete(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(order.details.exists())
+
+    def test_update_order_cancelled_meanwhile(self):
+        product = sample_product(stock=10)
+        order = sample_order()
+        stale = Order.objects.get(pk=order.pk)
+        order.delete()
+
+        with patch.object(OrderViewSet, 'get_object', return_value=stale):
+            res = self.client.put(
+                detail_url(order.id),
+                {'details': [{'product': product.id, 'cuantity': 5}]},
+                format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_delete_order_cancelled_meanwhile(self):
+        order = sample_order()
+        stale = Order.objects.get(pk=order.pk)
+        order.delete()
+
+        with patch.object(OrderViewSet, 'get_object', return_value=stale):
+            res = self.client.delete(detail_url(stale.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BulkOrderApiTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+                'test@test.com',
+                'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_orders(self):
+        product1 = sample_product(stock=10)
+        product2 = sample_product(stock=1)
+        payload = [
+            {'details': [{'product': product1.id, 'cuantity': 2}]},
+            {'details': [{'product': product2.id, 'cuantity': 5}]},
+            {'details': [{'product': 999, 'cuantity': 1}]},
+            {'details': [{'product': product1.id, 'cuantity': 3},
+                         {'product': product2.id, 'cuantity': 1}]},
+        ]
+
+        res = self.client.post(BULK_ORDER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2, 3])
+        self.assertIn('id', results[0])
+        self.assertIn('details', results[1]['errors'])
+        self.assertIn('details', results[2]['errors'])
+        self.assertIn('id', results[3])
+        self.assertEqual(Order.objects.count(), 2)
+        product1.refresh_from_db()
+        product2.refresh_from_db()
+        self.assertEqual(product1.stock, 5)
+        self.assertEqual(product2.stock, 0)
+
+    def test_bulk_create_validates_products_with_one_query(self):
+        products = [sample_product() for _ in range(5)]
+        payload = [
+            {'details': [{'product': product.id, 'cuantity': 1}]}
+            for product in products
+        ]
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(BULK_ORDER_URL, payload, format='json')
+
+        product_selects = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "store_product"' in query['sql']
+        ]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(product_selects), 1)
+
+    def test_bulk_create_reads_exchange_rate_once(self):
+        rate = ExchangeRate.objects.record(Decimal('200.00'))
+        product = sample_product(stock=10)
+        payload = [
+            {'details': [{'product': product.id, 'cuantity': 1}]}
+            for _ in range(5)
+        ]
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(BULK_ORDER_URL, payload, format='json')
+
+        rate_selects = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "store_exchangerate"' in query['sql']
+        ]
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(rate_selects), 1)
+        self.assertEqual(
+            set(Order.objects.values_list('exchange_rate', flat=True)),
+            {rate.id}
+        )
+
+    def test_bulk_create_records_sales_once_per_chunk(self):
+        products = [sample_product() for _ in range(3)]
+        payload = [
+            {'details': [{'product': product.id, 'cuantity': 1}]}
+            for product in products
+        ]
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(BULK_ORDER_URL, payload, format='json')
+
+        sales_writes = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('INSERT INTO "store_productsale"')
+        ]
+        self.assertEqual(len(sales_writes), 1)
+        self.assertEqual(
+            ProductSale.objects.aggregate(units=Sum('units'))['units'],
+            3
+        )
+
+    def test_bulk_create_orders_ndjson(self):
+        product = sample_product(stock=10)
+        lines = [
+            json.dumps({'details': [{'product': product.id, 'cuantity': 1}]})
+            for _ in range(3)
+        ]
+
+        res = self.client.post(
+            BULK_ORDER_URL,
+            "\n".join(lines),
+            content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 3)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 7)
+
+    def test_bulk_create_requires_list(self):
+        res = self.client.post(BULK_ORDER_URL, {'details': []}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,172 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Product, Order
+
+ORDER_URL = reverse('store:order-list')
+
+
+def status_url(order_id):
+    return reverse('store:order_status', args=[order_id])
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+class PendingOrderModelTests(TestCase):
+
+    def test_create_pending_keeps_stock(self):
+        product = sample_product(stock=10)
+        order = Order.objects.create_pending(
+            [{'product': product, 'cuantity': 4}]
+        )
+        product.refresh_from_db()
+        self.assertEqual(order.status, Order.PENDING)
+        self.assertEqual(order.details.count(), 1)
+        self.assertEqual(product.stock, 10)
+
+    def test_process_pending_confirms_batch(self):
+        product = sample_product(stock=10)
+        orders = [
+            Order.objects.create_pending([{'product': product, 'cuantity': 3}])
+            for _ in range(3)
+        ]
+
+        self.assertEqual(Order.objects.process_pending(10), 3)
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 1)
+        for order in orders:
+            order.refresh_from_db()
+            self.assertEqual(order.status, Order.CONFIRMED)
+        self.assertEqual(Order.objects.process_pending(10), 0)
+
+    def test_process_pending_rejects_orders_without_stock(self):
+        product1 = sample_product(name='product 1', stock=5)
+        product2 = sample_product(name='product 2', stock=5)
+        order1 = Order.objects.create_pending(
+            [{'product': product1, 'cuantity': 4}]
+        )
+        order2 = Order.objects.create_pending([
+            {'product': product1, 'cuantity': 4},
+            {'product': product2, 'cuantity': 1},
+        ])
+        order3 = Order.objects.create_pending(
+            [{'product': product2, 'cuantity': 4}]
+        )
+
+        Order.objects.process_pending(10)
+
+        order1.refresh_from_db()
+        order2.refresh_from_db()
+        order3.refresh_from_db()
+        product1.refresh_from_db()
+        product2.refresh_from_db()
+        self.assertTrue(order1.is_confirmed)
+        self.assertTrue(order2.is_rejected)
+        self.assertEqual(
+            order2.rejection_reason,
+            'Product product 1 do not have enough stock'
+        )
+        self.assertFalse(order2.details.exists())
+        self.assertTrue(order3.is_confirmed)
+        self.assertEqual(product1.stock, 1)
+        self.assertEqual(product2.stock, 1)
+
+    def test_process_pending_batch_size(self):
+        product = sample_product(stock=10)
+        for _ in range(3):
+            Order.objects.create_pending([{'product': product, 'cuantity': 1}])
+
+        self.assertEqual(Order.objects.process_pending(2), 2)
+        self.assertEqual(Order.objects.filter(status=Order.PENDING).count(), 1)
+
+    def test_delete_pending_order_keeps_stock(self):
+        product = sample_product(stock=10)
+        order = Order.objects.create_pending(
+            [{'product': product, 'cuantity': 4}]
+        )
+        order.delete_details()
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+    def test_process_orders_command(self):
+        product = sample_product(stock=10)
+        order = Order.objects.create_pending(
+            [{'product': product, 'cuantity': 4}]
+        )
+        call_command('process_orders', once=True, stdout=StringIO())
+        order.refresh_from_db()
+        self.assertTrue(order.is_confirmed)
+
+    def test_process_orders_workers_need_skip_locked(self):
+        with patch(
+            'django.db.connection.features.has_select_for_update_skip_locked',
+            False
+        ):
+            with self.assertRaises(CommandError):
+                call_command('process_orders', workers=2, once=True)
+
+
+@override_settings(ORDER_ASYNC_INTAKE=True)
+class AsyncOrderIntakeApiTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.client = APIClient()
+
+    def test_create_order_is_accepted(self):
+        product = sample_product(stock=10)
+        payload = {'details': [{'product': product.id, 'cuantity': 2}]}
+
+        res = self.client.post(ORDER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['status'], Order.PENDING)
+        self.assertTrue(res['Location'].endswith(status_url(res.data['id'])))
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+    def test_create_order_invalid(self):
+        res = self.client.post(ORDER_URL, {'details': []}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_status(self):
+        product = sample_product(stock=10)
+        payload = {'details': [{'product': product.id, 'cuantity': 2}]}
+        res = self.client.post(ORDER_URL, payload, format='json')
+        Order.objects.process_pending(10)
+
+        res = self.client.get(status_url(res.data['id']))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['status'], Order.CONFIRMED)
+        self.assertEqual(res.data['rejection_reason'], '')
+
+    @patch('store.exchange.cache.get')
+    def test_update_pending_order(self, mock_get_dollar_blue):
+        mock_get_dollar_blue.return_value = '217.00'
+        product = sample_product(stock=10)
+        order = Order.objects.create_pending(
+            [{'product': product, 'cuantity': 4}]
+        )
+        payload = {'details': [{'product': product.id, 'cuantity': 1}]}
+        url = reverse('store:order-detail', args=[order.id])
+
+        res = self.client.put(url, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,4 +1,9 @@
+from unittest import skipUnless
+
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -34,6 +39,7 @@ def sample_product(**params):
 class PrivateProductApiTest(TestCase):
 
     def setUp(self):
+        caches['products'].clear()
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
             'test@test.com',
@@ -50,7 +56,30 @@ class PrivateProductApiTest(TestCase):
         products = Product.objects.all()
         serializer = ProductSerializer(products, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_retrieve_products_paginated(self):
+        products = [sample_product() for _ in range(5)]
+
+        res = self.client.get(PRODUCT_URL, {'page_size': 2})
+        self.assertEqual(
+            [product['id'] for product in res.data['results']],
+            [products[0].id, products[1].id]
+        )
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [product['id'] for product in res.data['results']],
+            [products[2].id, products[3].id]
+        )
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [product['id'] for product in res.data['results']],
+            [products[4].id]
+        )
+        self.assertIsNone(res.data['next'])
 
     def test_view_product_detail(self):
         product = sample_product()
@@ -96,3 +125,109 @@ class PrivateProductApiTest(TestCase):
         self.client.put(url, {"stock": 20}, format='json')
         product.refresh_from_db()
         self.assertEqual(product.stock, 20)
+
+    def test_set_stock_invalid(self):
+        product = sample_product(stock=10)
+        url = reverse("store:set_stock", args=[product.id])
+        res = self.client.put(url, {"stock": -1}, format='json')
+        product.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(product.stock, 10)
+
+    def test_set_stock_product_not_found(self):
+        url = reverse("store:set_stock", args=[999])
+        res = self.client.put(url, {"stock": 20}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def product_names(self, params):
+        res = self.client.get(PRODUCT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [product['name'] for product in res.data['results']]
+
+    def test_filter_products(self):
+        sample_product(name='apple', price=1.5, stock=0)
+        sample_product(name='apricot', price=3, stock=4)
+        sample_product(name='banana', price=2, stock=1)
+        sharded = sample_product(name='pineapple', price=5, stock=6)
+        Product.objects.enable_sharded_stock(sharded.id, 2)
+
+        self.assertEqual(self.product_names({'name': 'ap'}), [
+            'apple', 'apricot'
+        ])
+        self.assertEqual(self.product_names({'name': 'Ap'}), [])
+        self.assertEqual(self.product_names({'name_contains': 'APPLE'}), [
+            'apple', 'pineapple'
+        ])
+        self.assertEqual(
+            self.product_names({'price_min': '2', 'price_max': '3'}),
+            ['apricot', 'banana']
+        )
+        self.assertEqual(self.product_names({'in_stock': 'true'}), [
+            'apricot', 'banana', 'pineapple'
+        ])
+        self.assertEqual(self.product_names({'in_stock': 'false'}), [
+            'apple'
+        ])
+
+    def test_filter_products_invalid(self):
+        res = self.client.get(PRODUCT_URL, {'price_min': 'cheap'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('price_min', res.data)
+
+    def test_order_products(self):
+        sample_product(name='b', price=1)
+        sample_product(name='c', price=3)
+        sample_product(name='a', price=2)
+
+        self.assertEqual(self.product_names({'ordering': 'name'}), [
+            'a', 'b', 'c'
+        ])
+        self.assertEqual(
+            self.product_names({'ordering': '-price', 'page_size': 2}),
+            ['c', 'a']
+        )
+        res = self.client.get(
+            PRODUCT_URL,
+            {'ordering': 'price', 'page_size': 2}
+        )
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [product['name'] for product in res.data['results']],
+            ['c']
+        )
+
+    def test_paginate_ties(self):
+        products = [sample_product(price=5) for _ in range(3)]
+        params = {'ordering': '-price', 'page_size': 1}
+
+        pages = [self.client.get(PRODUCT_URL, params)]
+        while pages[-1].data['next']:
+            pages.append(self.client.get(pages[-1].data['next']))
+        previous = self.client.get(pages[-1].data['previous'])
+
+        self.assertEqual(
+            [page.data['results'][0]['id'] for page in pages],
+            [product.id for product in products]
+        )
+        self.assertEqual(previous.data['results'], pages[1].data['results'])
+
+    def test_invalid_cursor(self):
+        res = self.client.get(PRODUCT_URL, {'cursor': 'invalid'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite query plans')
+    def test_filters_use_indexes(self):
+        view_filters = (
+            {'name': 'ap'},
+            {'price_min': '1', 'price_max': '2'},
+            {'ordering': 'stock'},
+            {'in_stock': 'true'},
+        )
+        for params in view_filters:
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(PRODUCT_URL, params)
+            sql = context.captured_queries[-1]['sql']
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            self.assertRegex(plan, 'USING (COVERING )?INDEX store_produ')
@@ -0,0 +1,161 @@
+from django.core.cache import cache, caches
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.catalog import PRODUCT_VERSION_KEY
+from store.models import Product, Order
+from store.repositories import HITS_KEY, MISSES_KEY, ProductRepository
+
+ORDER_URL = reverse('store:order-list')
+CACHE_STATS_URL = reverse('store:product_cache_stats')
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+def product_selects(queries):
+    return [
+        query for query in queries
+        if query['sql'].startswith('SELECT')
+        and 'FROM "store_product"' in query['sql']
+    ]
+
+
+class ProductRepositoryTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        cache.delete_many([HITS_KEY, MISSES_KEY])
+        self.repository = ProductRepository()
+
+    def test_get_warms_cache(self):
+        product = sample_product()
+        self.assertEqual(self.repository.get(product.id), product)
+
+        with self.assertNumQueries(0):
+            cached = self.repository.get(str(product.id))
+
+        self.assertEqual(cached.name, product.name)
+        self.assertEqual(self.repository.stats(), {'hits': 1, 'misses': 1})
+
+    def test_stats_shared_between_workers(self):
+        product = sample_product()
+        self.repository.get(product.id)
+        # Another worker has its own product cache.
+        caches['products'].clear()
+
+        self.repository.get(product.id)
+
+        self.assertEqual(self.repository.stats(), {'hits': 0, 'misses': 2})
+
+    def test_get_missing_product(self):
+        self.assertIsNone(self.repository.get(999))
+
+    def test_get_many(self):
+        product1 = sample_product()
+        product2 = sample_product()
+        self.repository.get(product1.id)
+
+        with self.assertNumQueries(1):
+            products = self.repository.get_many([product1.id, product2.id])
+
+        self.assertEqual(
+            products,
+            {product1.id: product1, product2.id: product2}
+        )
+
+    def test_writes_invalidate_cache(self):
+        product = sample_product(stock=10)
+        self.repository.get(product.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create().add_details(
+                [{'product': product, 'cuantity': 4}]
+            )
+
+        self.assertEqual(self.repository.get(product.id).stock, 6)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'renamed'
+            product.save()
+
+        self.assertEqual(self.repository.get(product.id).name, 'renamed')
+
+        product_id = product.id
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+
+        self.assertIsNone(self.repository.get(product_id))
+
+    def test_other_worker_writes_invalidate_cache(self):
+        product = sample_product(price=100)
+        self.repository.get(product.id)
+        # Another worker only shares the default cache, its write changes
+        # the product version but not this process' product cache.
+        Product.objects.filter(pk=product.id).update(price=80)
+        key = PRODUCT_VERSION_KEY.format(product.id)
+        self.addCleanup(cache.delete, key)
+        cache.set(key, 'other', None)
+
+        self.assertEqual(self.repository.get(product.id).price, 80)
+
+
+class ProductCacheApiTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        cache.delete_many([HITS_KEY, MISSES_KEY])
+        self.client = APIClient()
+
+    def test_order_validation_reads_products_from_cache(self):
+        product = sample_product(stock=10)
+        payload = {'details': [{'product': product.id, 'cuantity': 1}]}
+        self.client.post(ORDER_URL, payload, format='json')
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(ORDER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(product_selects(context.captured_queries), [])
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 8)
+
+    def test_reservation_does_not_trust_cached_stock(self):
+        product = sample_product(stock=10)
+        ProductRepository().get(product.id)
+        Product.objects.filter(pk=product.pk).update(stock=0)
+        payload = {'details': [{'product': product.id, 'cuantity': 1}]}
+
+        res = self.client.post(ORDER_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cache_stats_requires_admin(self):
+        user = get_user_model().objects.create_user('test@test.com', 'pass')
+        self.client.force_authenticate(user)
+        res = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cache_stats(self):
+        admin = get_user_model().objects.create_superuser(
+            'admin@test.com',
+            'pass'
+        )
+        self.client.force_authenticate(admin)
+        product = sample_product()
+        ProductRepository().get(product.id)
+
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'hits': 0, 'misses': 1})
@@ -0,0 +1,278 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Product, Order, ProductSale
+
+SALES_URL = reverse('store:sales_report-list')
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+def order_url(order_id):
+    return reverse('store:order-detail', args=[order_id])
+
+
+def delete_detail_url(order_id, detail_id):
+    return reverse('store:delete_detail', args=[order_id, detail_id])
+
+
+class ProductSaleTests(TestCase):
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.product1 = sample_product(price=10)
+        self.product2 = sample_product(price=2.5)
+
+    def get_sales(self):
+        return {
+            sale.product_id: (sale.units, sale.revenue)
+            for sale in ProductSale.objects.filter(date=self.today)
+        }
+
+    def test_record_sales(self):
+        ProductSale.objects.record({
+            (self.today, self.product1.id): (2, Decimal('20')),
+        })
+        ProductSale.objects.record({
+            (self.today, self.product1.id): (1, Decimal('10')),
+            (self.today, self.product2.id): (4, Decimal('10')),
+        })
+
+        self.assertEqual(self.get_sales(), {
+            self.product1.id: (3, Decimal('30')),
+            self.product2.id: (4, Decimal('10')),
+        })
+
+    def test_record_many_sales(self):
+        sales = {
+            (self.today - timedelta(days=day), self.product1.id):
+                (1, Decimal('10'))
+            for day in range(1200)
+        }
+
+        ProductSale.objects.record(sales)
+        ProductSale.objects.record(sales)
+
+        self.assertEqual(ProductSale.objects.count(), 1200)
+        self.assertEqual(
+            set(ProductSale.objects.values_list('units', 'revenue')),
+            {(2, Decimal('20'))}
+        )
+
+    def test_collect_records_once(self):
+        with CaptureQueriesContext(connection) as context:
+            with ProductSale.objects.collect():
+                ProductSale.objects.record({
+                    (self.today, self.product1.id): (2, Decimal('20')),
+                })
+                with ProductSale.objects.collect():
+                    ProductSale.objects.record({
+                        (self.today, self.product1.id): (1, Decimal('10')),
+                        (self.today, self.product2.id): (4, Decimal('10')),
+                    })
+                self.assertEqual(self.get_sales(), {})
+
+        self.assertEqual(len(context.captured_queries), 3)
+        self.assertEqual(self.get_sales(), {
+            self.product1.id: (3, Decimal('30')),
+            self.product2.id: (4, Decimal('10')),
+        })
+
+    def test_collect_drops_failed_block(self):
+        with ProductSale.objects.collect():
+            ProductSale.objects.record({
+                (self.today, self.product1.id): (2, Decimal('20')),
+            })
+            with self.assertRaises(ValueError):
+                with ProductSale.objects.collect():
+                    ProductSale.objects.record({
+                        (self.today, self.product2.id): (4, Decimal('10')),
+                    })
+                    raise ValueError
+
+        self.assertEqual(self.get_sales(), {
+            self.product1.id: (2, Decimal('20')),
+        })
+
+    def test_failed_update_records_no_sales(self):
+        order = Order.objects.create()
+        order.add_details([{'product': self.product1, 'cuantity': 2}])
+        # The new line is added before the update of the first one fails.
+        payload = {'details': [
+            {'product': self.product1.id, 'cuantity': 50},
+            {'product': self.product2.id, 'cuantity': 1},
+        ]}
+
+        res = APIClient().put(order_url(order.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get_sales(), {
+            self.product1.id: (2, Decimal('20')),
+        })
+
+    def test_order_changes_update_sales(self):
+        order = Order.objects.create()
+        order.add_details([
+            {'product': self.product1, 'cuantity': 2},
+            {'product': self.product2, 'cuantity': 4},
+        ])
+        self.assertEqual(self.get_sales(), {
+            self.product1.id: (2, Decimal('20')),
+            self.product2.id: (4, Decimal('10')),
+        })
+
+        order.update_details(
+            [{'product': self.product1, 'cuantity': 5}],
+            list(order.details.all())
+        )
+        self.assertEqual(
+            self.get_sales()[self.product1.id],
+            (5, Decimal('50'))
+        )
+
+        order.delete_details()
+        self.assertEqual(self.get_sales(), {
+            self.product1.id: (0, Decimal('0')),
+            self.product2.id: (0, Decimal('0')),
+        })
+
+    def test_pending_orders_count_once_confirmed(self):
+        Order.objects.create_pending([
+            {'product': self.product1, 'cuantity': 3},
+        ])
+        Order.objects.create_pending([
+            {'product': self.product2, 'cuantity': 50},
+        ])
+        self.assertEqual(self.get_sales(), {})
+
+        Order.objects.process_pending(10)
+
+        self.assertEqual(self.get_sales(), {
+            self.product1.id: (3, Decimal('30')),
+        })
+
+    def test_delete_detail_updates_sales(self):
+        caches['products'].clear()
+        order = Order.objects.create()
+        order.add_details([
+            {'product': self.product1, 'cuantity': 2},
+            {'product': self.product2, 'cuantity': 4},
+        ])
+        detail = order.details.get(product=self.product2)
+
+        res = APIClient().delete(delete_detail_url(order.id, detail.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_sales()[self.product2.id], (0, Decimal('0')))
+
+
+class SalesReportApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+        self.product1 = sample_product()
+        self.product2 = sample_product()
+        ProductSale.objects.record({
+            (self.yesterday, self.product1.id): (1, Decimal('100')),
+            (self.today, self.product1.id): (2, Decimal('200')),
+            (self.today, self.product2.id): (3, Decimal('300')),
+        })
+
+    def test_sales_report(self):
+        res = self.client.get(SALES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0], {
+            'date': self.yesterday.isoformat(),
+            'product': self.product1.id,
+            'units': 1,
+            'revenue': '100.00',
+        })
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_sales_report_filters(self):
+        res = self.client.get(SALES_URL, {
+            'start': self.today.isoformat(),
+            'product': f'{self.product1.id}',
+        })
+        self.assertEqual(
+            [(sale['date'], sale['units']) for sale in res.data['results']],
+            [(self.today.isoformat(), 2)]
+        )
+
+        res = self.client.get(SALES_URL, {'end': self.yesterday.isoformat()})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_sales_report_invalid_filters(self):
+        res = self.client.get(SALES_URL, {'product': 'one', 'end': 'today'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(res.data), {'product', 'end'})
+
+
+class RebuildSalesRollupsCommandTests(TestCase):
+
+    def setUp(self):
+        self.product = sample_product(price=10)
+        self.order = Order.objects.create()
+        self.order.add_details([{'product': self.product, 'cuantity': 2}])
+
+    def test_no_drift(self):
+        out = StringIO()
+        call_command('rebuild_sales_rollups', '--verify', stdout=out)
+        self.assertIn('1 rollups checked, 0 drifted', out.getvalue())
+
+    def test_price_change_is_not_drift(self):
+        Product.objects.filter(pk=self.product.id).update(price=15)
+        out = StringIO()
+
+        call_command('rebuild_sales_rollups', '--verify', stdout=out)
+
+        self.assertIn('1 rollups checked, 0 drifted', out.getvalue())
+
+    def test_verify_reports_drift(self):
+        ProductSale.objects.all().delete()
+        out = StringIO()
+
+        call_command('rebuild_sales_rollups', '--verify', stdout=out)
+
+        self.assertIn('units 0 != 2', out.getvalue())
+        self.assertIn('1 rollups checked, 1 drifted', out.getvalue())
+        self.assertFalse(ProductSale.objects.exists())
+
+    def test_rebuild(self):
+        ProductSale.objects.update(units=7)
+        ProductSale.objects.create(
+            product=self.product,
+            date=timezone.localdate() - timedelta(days=3),
+            units=1,
+            revenue=10
+        )
+        out = StringIO()
+
+        call_command('rebuild_sales_rollups', stdout=out)
+
+        self.assertIn('1 rollups checked, 2 fixed', out.getvalue())
+        self.assertEqual(
+            list(ProductSale.objects.values_list('units', 'revenue')),
+            [(2, Decimal('20'))]
+        )
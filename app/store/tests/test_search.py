@@ -0,0 +1,119 @@
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Product
+from store.search import get_search_backend, search_products
+
+SEARCH_URL = reverse('store:product_search')
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+def search(query):
+    return list(
+        search_products(Product.objects.all(), query)
+        .order_by('-search_rank', 'id')
+        .values_list('name', flat=True)
+    )
+
+
+class ProductSearchTests(TestCase):
+
+    def test_index_follows_product_changes(self):
+        product = sample_product(name='Red apple')
+        self.assertEqual(search('apple'), ['Red apple'])
+
+        product.name = 'Green pear'
+        product.save()
+        self.assertEqual(search('apple'), [])
+        self.assertEqual(search('pear'), ['Green pear'])
+
+        product.delete()
+        self.assertEqual(search('pear'), [])
+
+    def test_search_prefix_and_all_terms(self):
+        sample_product(name='Red apple')
+        sample_product(name='Apple pie')
+        sample_product(name='Red wine')
+
+        self.assertEqual(sorted(search('app')), ['Apple pie', 'Red apple'])
+        self.assertEqual(search('red app'), ['Red apple'])
+        self.assertEqual(search('"*):'), [])
+
+    def test_search_ranking(self):
+        sample_product(name='apple juice with a lot of other words')
+        sample_product(name='apple apple')
+
+        self.assertEqual(search('apple'), [
+            'apple apple',
+            'apple juice with a lot of other words',
+        ])
+
+    def test_rebuild_command(self):
+        sample_product(name='Red apple')
+        Product.objects.bulk_create([
+            Product(name='Green apple', price=1, stock=1),
+        ])
+        with connection.cursor() as cursor:
+            get_search_backend().clear(cursor)
+
+        out = StringIO()
+        call_command('rebuild_product_search', '--batch-size', '1', stdout=out)
+
+        self.assertIn('2 products indexed', out.getvalue())
+        self.assertEqual(sorted(search('apple')), ['Green apple', 'Red apple'])
+
+
+class ProductSearchApiTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.client = APIClient()
+
+    def test_search_products(self):
+        for name in ('Red apple', 'Apple pie', 'Pear'):
+            sample_product(name=name)
+
+        res = self.client.get(SEARCH_URL, {'q': 'apple', 'page_size': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 2)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(
+            set(res.data['results'][0]),
+            {'id', 'name', 'stock', 'price'}
+        )
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+
+    def test_search_with_filters(self):
+        sample_product(name='Red apple', stock=0)
+        sample_product(name='Apple pie', stock=3)
+
+        res = self.client.get(SEARCH_URL, {'q': 'apple', 'in_stock': 'true'})
+
+        self.assertEqual(
+            [product['name'] for product in res.data['results']],
+            ['Apple pie']
+        )
+
+    def test_search_requires_query(self):
+        res = self.client.get(SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('q', res.data)
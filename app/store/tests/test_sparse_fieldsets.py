@@ -0,0 +1,125 @@
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Product, Order
+
+PRODUCT_URL = reverse('store:product-list')
+ORDER_URL = reverse('store:order-list')
+
+
+def order_detail_url(order_id):
+    return reverse('store:order-detail', args=[order_id])
+
+
+def product_detail_url(product_id):
+    return reverse('store:product-detail', args=[product_id])
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+class SparseFieldsetsTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.client = APIClient()
+        self.product = sample_product(stock=9)
+        Product.objects.enable_sharded_stock(self.product.id, 3)
+        self.order = Order.objects.create()
+        self.order.add_details([{'product': self.product, 'cuantity': 2}])
+
+    @patch('store.exchange.cache.get')
+    def test_order_fields(self, mock_get):
+        with self.assertNumQueries(1):
+            res = self.client.get(ORDER_URL, {'fields': 'id,date_time'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(res.data['results'][0]), ['id', 'date_time'])
+        mock_get.assert_not_called()
+
+    @patch('store.exchange.cache.get', return_value='200')
+    def test_order_fields_with_details(self, mock_get):
+        with self.assertNumQueries(2):
+            res = self.client.get(
+                order_detail_url(self.order.id),
+                {'fields': 'details,get_total_usd'}
+            )
+
+        self.assertEqual(res.data, {
+            'details': [{
+                'id': self.order.details.get().id,
+                'product': self.product.id,
+                'cuantity': 2,
+            }],
+            'get_total_usd': 1.0,
+        })
+
+    @patch('store.exchange.cache.get', return_value='200')
+    def test_order_expand_products(self, mock_get):
+        with self.assertNumQueries(3):
+            res = self.client.get(
+                ORDER_URL,
+                {'fields': 'id', 'expand': 'details.product'}
+            )
+
+        order = res.data['results'][0]
+        self.assertEqual(list(order), ['id', 'details'])
+        self.assertEqual(order['details'][0]['product'], {
+            'id': self.product.id,
+            'name': self.product.name,
+            'stock': 7,
+            'price': '100.00',
+        })
+
+    def test_unknown_fields(self):
+        res = self.client.get(ORDER_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+        res = self.client.get(PRODUCT_URL, {'expand': 'stock_shards'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expand', res.data)
+
+    def test_product_fields_skip_shards_stock(self):
+        with self.assertNumQueries(1) as context:
+            res = self.client.get(PRODUCT_URL, {'fields': 'id,name'})
+
+        sql = context.captured_queries[0]['sql']
+        self.assertNotIn('store_stockshard', sql)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.product.id, 'name': self.product.name}]
+        )
+
+    def test_product_retrieve_fields(self):
+        res = self.client.get(
+            product_detail_url(self.product.id),
+            {'fields': 'stock'}
+        )
+
+        self.assertEqual(res.data, {'stock': 7})
+
+    @patch('store.exchange.cache.get', return_value='200')
+    def test_fast_serialization_fields(self, mock_get):
+        for url, fields in (
+            (ORDER_URL, 'id,status,get_total_usd'),
+            (ORDER_URL, 'details'),
+            (PRODUCT_URL, 'price,name'),
+            (PRODUCT_URL, 'stock'),
+        ):
+            res = self.client.get(url, {'fields': fields})
+            with override_settings(FAST_SERIALIZATION=True):
+                fast_res = self.client.get(url, {'fields': fields})
+            self.assertEqual(fast_res.content, res.content)
@@ -0,0 +1,164 @@
+from io import StringIO
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.core.management import call_command
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from store.models import Product, StockShard, Order
+from store.api.serializers import ProductSerializer
+
+
+def sample_product(**params):
+    defaults = {'name': 'sample product', 'stock': 20, 'price': 100.00}
+
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+def shards_stock(product):
+    return list(
+        product.stock_shards.order_by('index').values_list('stock', flat=True)
+    )
+
+
+class StockShardModelTests(TestCase):
+
+    def test_split(self):
+        self.assertEqual(StockShard.objects.split(10, 4), [3, 3, 2, 2])
+
+    def test_enable_sharded_stock(self):
+        product = sample_product(stock=10)
+        product = Product.objects.enable_sharded_stock(product.id, 4)
+
+        self.assertTrue(product.sharded_stock)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(shards_stock(product), [3, 3, 2, 2])
+        self.assertEqual(product.available_stock, 10)
+
+    def test_disable_sharded_stock(self):
+        product = sample_product(stock=10)
+        Product.objects.enable_sharded_stock(product.id, 4)
+        product = Product.objects.disable_sharded_stock(product.id)
+
+        self.assertFalse(product.sharded_stock)
+        self.assertEqual(product.stock, 10)
+        self.assertFalse(StockShard.objects.exists())
+
+    def test_decrease_stock_from_one_shard(self):
+        product = sample_product(stock=10)
+        Product.objects.enable_sharded_stock(product.id, 2)
+
+        self.assertTrue(Product.objects.decrease_stock(product.id, 3))
+        self.assertEqual(sorted(shards_stock(product)), [2, 5])
+
+    def test_decrease_stock_spread_over_shards(self):
+        product = sample_product(stock=10)
+        Product.objects.enable_sharded_stock(product.id, 4)
+
+        self.assertTrue(Product.objects.decrease_stock(product.id, 9))
+        self.assertEqual(StockShard.objects.total_stock(product.id), 1)
+
+    def test_decrease_stock_insufficient(self):
+        product = sample_product(stock=10)
+        Product.objects.enable_sharded_stock(product.id, 4)
+
+        self.assertFalse(Product.objects.decrease_stock(product.id, 11))
+        self.assertEqual(shards_stock(product), [3, 3, 2, 2])
+
+    def test_increase_stocks(self):
+        product1 = sample_product(stock=10)
+        product2 = sample_product(stock=10)
+        Product.objects.enable_sharded_stock(product1.id, 4)
+
+        Product.objects.increase_stocks({product1.id: 5, product2.id: 5})
+
+        product2.refresh_from_db()
+        self.assertEqual(StockShard.objects.total_stock(product1.id), 15)
+        self.assertEqual(product2.stock, 15)
+
+    def test_set_stock(self):
+        product = sample_product(stock=10)
+        product = Product.objects.enable_sharded_stock(product.id, 4)
+        product.set_stock(6)
+
+        self.assertEqual(shards_stock(product), [2, 2, 1, 1])
+
+    def test_rebalance(self):
+        product = sample_product(stock=8)
+        Product.objects.enable_sharded_stock(product.id, 2)
+        StockShard.objects.filter(product=product, index=0).update(stock=0)
+
+        self.assertEqual(StockShard.objects.rebalance(product.id), 4)
+        self.assertEqual(shards_stock(product), [2, 2])
+
+    def test_order_with_sharded_product(self):
+        product = sample_product(stock=10)
+        product = Product.objects.enable_sharded_stock(product.id, 4)
+        order = Order.objects.create()
+        order.add_details([{'product': product, 'cuantity': 7}])
+        self.assertEqual(product.available_stock, 3)
+
+        order.delete_details()
+        self.assertEqual(product.available_stock, 10)
+
+
+class StockShardApiTests(TestCase):
+
+    def setUp(self):
+        caches['products'].clear()
+        self.client = APIClient()
+
+    def test_product_stock_is_summed_from_shards(self):
+        product = sample_product(stock=10)
+        Product.objects.enable_sharded_stock(product.id, 4)
+
+        res = self.client.get(reverse('store:product-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['stock'], 10)
+        product.refresh_from_db()
+        serializer = ProductSerializer([product], many=True)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_update_sharded_product_stock(self):
+        product = sample_product(stock=10)
+        Product.objects.enable_sharded_stock(product.id, 2)
+        url = reverse('store:product-detail', args=[product.id])
+
+        self.client.patch(url, {'stock': 4})
+
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(shards_stock(product), [2, 2])
+
+
+class StockShardCommandTests(TestCase):
+
+    def test_shard_stock_command(self):
+        product = sample_product(stock=10)
+        call_command('shard_stock', product.id, shards=5, stdout=StringIO())
+        self.assertEqual(shards_stock(product), [2, 2, 2, 2, 2])
+
+        call_command(
+            'shard_stock',
+            product.id,
+            disable=True,
+            stdout=StringIO()
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+    def test_rebalance_stock_shards_command(self):
+        product = sample_product(stock=8)
+        Product.objects.enable_sharded_stock(product.id, 2)
+        StockShard.objects.filter(product=product, index=0).update(stock=0)
+
+        out = StringIO()
+        call_command('rebalance_stock_shards', stdout=out)
+
+        self.assertEqual(shards_stock(product), [2, 2])
+        self.assertIn(f"Product {product.id}: 4 in stock", out.getvalue())
@@ -1,5 +1,13 @@
+import threading
+import time
+
+from django.core.cache import cache
 from django.test import TestCase
-from store.utils import has_values, convert_string_to_decimal
+from store.utils import has_values, convert_string_to_decimal, Computed, \
+                        get_or_compute, get_compute_stats, single_flight, \
+                        COMPUTE_LOCK_KEY, COMPUTED_KEY, COALESCED_KEY
+
+KEY = 'test:computed'
 
 
 class UtilsTests(TestCase):
@@ -17,3 +25,98 @@ class UtilsTests(TestCase):
     def test_convert_string_to_decimal(self):
         result = convert_string_to_decimal('200.00')
         self.assertAlmostEqual(result, 200.00)
+
+
+class GetOrComputeTests(TestCase):
+
+    def setUp(self):
+        self.clear()
+        self.addCleanup(self.clear)
+        self.calls = 0
+
+    def clear(self):
+        cache.delete_many([
+            key.format(KEY)
+            for key in ('{}', COMPUTE_LOCK_KEY, COMPUTED_KEY, COALESCED_KEY)
+        ])
+
+    def compute(self, value=1, delay=0):
+        self.calls += 1
+        time.sleep(delay)
+        return value
+
+    def test_computes_once(self):
+        self.assertEqual(get_or_compute(KEY, self.compute), 1)
+        self.assertEqual(get_or_compute(KEY, self.compute), 1)
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(
+            get_compute_stats(KEY),
+            {'computed': 1, 'coalesced': 0}
+        )
+
+    def test_concurrent_callers_are_coalesced(self):
+        results = []
+
+        def call():
+            results.append(
+                get_or_compute(KEY, lambda: self.compute(delay=0.2))
+            )
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(
+            get_compute_stats(KEY),
+            {'computed': 1, 'coalesced': 4}
+        )
+
+    def test_lock_lease_expires(self):
+        # A caller that took the lock and died.
+        cache.add(COMPUTE_LOCK_KEY.format(KEY), True, 0.2)
+
+        start = time.monotonic()
+        self.assertEqual(get_or_compute(KEY, self.compute), 1)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(get_compute_stats(KEY)['coalesced'], 1)
+
+    def test_expires_early(self):
+        cache.set(KEY, Computed(0, 10, time.time() + 1))
+
+        self.assertEqual(get_or_compute(KEY, self.compute, beta=0), 0)
+        self.assertEqual(get_or_compute(KEY, self.compute, beta=100), 1)
+
+    def test_stale_value_while_recomputing(self):
+        cache.set(KEY, Computed(0, 10, time.time() + 1))
+        cache.add(COMPUTE_LOCK_KEY.format(KEY), True, 10)
+
+        self.assertEqual(get_or_compute(KEY, self.compute, beta=100), 0)
+        self.assertEqual(self.calls, 0)
+
+    def test_computed_none_is_cached(self):
+        get_or_compute(KEY, lambda: self.compute(None))
+
+        self.assertIsNone(get_or_compute(KEY, self.compute))
+        self.assertEqual(self.calls, 1)
+
+    def test_plain_value(self):
+        cache.set(KEY, 'plain')
+
+        self.assertEqual(get_or_compute(KEY, self.compute), 'plain')
+        self.assertEqual(self.calls, 0)
+
+    def test_single_flight(self):
+        @single_flight('test:{}')
+        def compute(name):
+            return self.compute(name.upper())
+
+        self.assertEqual(compute('computed'), 'COMPUTED')
+        self.assertEqual(cache.get(KEY).value, 'COMPUTED')
+        self.assertEqual(compute('computed'), 'COMPUTED')
+        self.assertEqual(self.calls, 1)
@@ -1,16 +1,58 @@
 from django.urls import path, include
+from rest_framework.permissions import IsAdminUser
 from rest_framework.routers import DefaultRouter
 
 from store.api import views
+from store.api.renderers import EXPORT_RENDERER_CLASSES
 
 router = DefaultRouter()
 router.register('products', views.ProductViewSet)
 router.register('orders', views.OrderViewSet)
+router.register(
+    'reports/sales',
+    views.SalesReportViewSet,
+    basename='sales_report'
+)
 
 
 app_name = 'store'
 
 urlpatterns = [
+    path(
+        "orders/bulk/",
+        views.OrderViewSet.as_view({
+            'post': 'bulk_create',
+        }),
+        name="bulk_create"),
+    path(
+        "products/search/",
+        views.ProductViewSet.as_view({'get': 'search'}),
+        name="product_search"),
+    path(
+        "products/top/",
+        views.ProductViewSet.as_view({'get': 'top'}),
+        name="product_top"),
+    path(
+        "products/cache/stats/",
+        views.ProductViewSet.as_view(
+            {'get': 'cache_stats'},
+            permission_classes=(IsAdminUser,)
+        ),
+        name="product_cache_stats"),
+    path(
+        "orders/export/",
+        views.OrderViewSet.as_view(
+            {'get': 'export'},
+            renderer_classes=EXPORT_RENDERER_CLASSES
+        ),
+        name="order_export"),
+    path(
+        "products/export/",
+        views.ProductViewSet.as_view(
+            {'get': 'export'},
+            renderer_classes=EXPORT_RENDERER_CLASSES
+        ),
+        name="product_export"),
     path('', include(router.urls)),
     path(
         "orders/<int:pk>/details/<int:detail_id>",
@@ -18,6 +60,12 @@ urlpatterns = [
             'delete': 'delete_detail',
         }),
         name="delete_detail"),
+    path(
+        "orders/<int:pk>/status/",
+        views.OrderViewSet.as_view({
+            'get': 'order_status',
+        }),
+        name="order_status"),
     path(
         "products/<int:pk>/stock/",
         views.ProductViewSet.as_view({
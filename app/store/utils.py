@@ -1,11 +1,21 @@
-from typing import List
+import math
+import random
+import time
 from decimal import Decimal
+from functools import partial, wraps
+from typing import Any, Callable, Dict, List, NamedTuple, Union
 
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
 
-def select_for_update(model, pk):
-    return model.objects \
-                .select_for_update() \
-                .get(pk=pk)
+COMPUTE_LOCK_KEY = '{}:lock'
+COMPUTED_KEY = '{}:computed'
+COALESCED_KEY = '{}:coalesced'
+DEFAULT_LEASE = 10
+DEFAULT_BETA = 1.0
+POLL_INTERVAL = 0.05
+
+_missing = object()
 
 
 def has_values(values: List) -> bool:
@@ -15,3 +25,113 @@ def has_values(values: List) -> bool:
 
 def convert_string_to_decimal(string: str) -> Decimal:
     return Decimal(string.replace(',', '.'))
+
+
+class Computed(NamedTuple):
+    value: Any
+    # Seconds the computation took and when the entry expires.
+    delta: float
+    expires: Union[float, None]
+
+    def expires_early(self, beta: float) -> bool:
+        # Probabilistic early expiration: the closer to ``expires`` and the
+        # slower the computation, the likelier one caller recomputes it.
+        if self.expires is None:
+            return False
+        jitter = self.delta * beta * math.log(1 - random.random())
+        return time.time() - jitter >= self.expires
+
+
+def count(cache, key, value=1):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        cache.set(key, value, None)
+
+
+def get_or_compute(key: str, compute: Callable, timeout=DEFAULT_TIMEOUT,
+                   lease=DEFAULT_LEASE, beta=DEFAULT_BETA,
+                   using=DEFAULT_CACHE_ALIAS):
+    """
+    Cached value of ``key``, computed by a single caller at a time when
+    it is missing: the others wait for it instead of computing it again.
+    With a cache shared by several processes this holds across them.
+
+    The caller computing it holds a lock for at most ``lease`` seconds,
+    then another one takes over. Entries are recomputed a bit before they
+    expire (``beta`` weights how early) while the rest keep getting the
+    current value. Values stored with a plain ``cache.set``, like the
+    ones of a refresher, are returned as they are.
+    """
+    cache = caches[using]
+    coalesced = False
+    while True:
+        entry = cache.get(key, _missing)
+        if entry is not _missing:
+            if not isinstance(entry, Computed):
+                return entry
+            if coalesced or not entry.expires_early(beta):
+                return entry.value
+
+        lock_key = COMPUTE_LOCK_KEY.format(key)
+        if cache.add(lock_key, True, lease):
+            try:
+                # The previous holder may have stored it after our read.
+                current = cache.get(key, _missing)
+                if current is not _missing and current != entry:
+                    if isinstance(current, Computed):
+                        return current.value
+                    return current
+                return _compute(cache, key, compute, timeout)
+            finally:
+                cache.delete(lock_key)
+        if entry is not _missing:
+            return entry.value
+
+        if not coalesced:
+            coalesced = True
+            count(cache, COALESCED_KEY.format(key))
+        time.sleep(POLL_INTERVAL)
+
+
+def _compute(cache, key, compute, timeout):
+    start = time.monotonic()
+    value = compute()
+    if timeout is DEFAULT_TIMEOUT:
+        timeout = cache.default_timeout
+    expires = None if timeout is None else time.time() + timeout
+    cache.set(
+        key,
+        Computed(value, time.monotonic() - start, expires),
+        timeout
+    )
+    count(cache, COMPUTED_KEY.format(key))
+    return value
+
+
+def single_flight(key: str, **options):
+    """
+    ``get_or_compute`` as a decorator, ``key`` is formatted with the
+    arguments of the call.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            return get_or_compute(
+                key.format(*args, **kwargs),
+                partial(function, *args, **kwargs),
+                **options
+            )
+        return wrapper
+    return decorator
+
+
+def get_compute_stats(key: str, using=DEFAULT_CACHE_ALIAS) -> Dict[str, int]:
+    counters = caches[using].get_many(
+        [COMPUTED_KEY.format(key), COALESCED_KEY.format(key)]
+    )
+    return {
+        'computed': counters.get(COMPUTED_KEY.format(key), 0),
+        'coalesced': counters.get(COALESCED_KEY.format(key), 0),
+    }
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from user.models import User, drop_cached_on_change
+
+        post_save.connect(drop_cached_on_change, sender=User)
+        post_delete.connect(drop_cached_on_change, sender=User)
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import CACHED_USER_FIELDS, get_user_cache_key
+
+DEFAULT_USER_CACHE_TIMEOUT = 60
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that keeps the user of a token in the cache for
+    ``USER_CACHE_TIMEOUT`` seconds instead of loading it on every
+    request. Only ``CACHED_USER_FIELDS`` are kept, the other fields of a
+    cached user are deferred and loaded on access. ``drop_cached_user``
+    drops the entry whenever the user is saved or deleted.
+    """
+
+    def get_user(self, validated_token):
+        key = get_user_cache_key(
+            validated_token.get(api_settings.USER_ID_CLAIM)
+        )
+        fields = cache.get(key)
+        if fields is not None:
+            # from_db takes the values in the order of the model fields.
+            names = [
+                field.attname
+                for field in self.user_model._meta.concrete_fields
+                if field.attname in fields
+            ]
+            return self.user_model.from_db(
+                self.user_model.objects.db,
+                names,
+                [fields[name] for name in names]
+            )
+
+        # Missing or inactive users are never cached.
+        user = super().get_user(validated_token)
+        cache.set(
+            key,
+            {name: getattr(user, name) for name in CACHED_USER_FIELDS},
+            getattr(settings, 'USER_CACHE_TIMEOUT', DEFAULT_USER_CACHE_TIMEOUT)
+        )
+        return user
@@ -1,7 +1,33 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 
+USER_KEY = 'user:{}'
+# Only what authentication needs is cached, never the password hash.
+CACHED_USER_FIELDS = (
+    'id', 'email', 'name', 'is_active', 'is_staff', 'is_superuser'
+)
+
+
+def get_user_cache_key(user_id) -> str:
+    return USER_KEY.format(user_id)
+
+
+def drop_cached_user(user_id):
+    """
+    Drop the user cached by ``CachedJWTAuthentication`` once the current
+    transaction commits. Saves and deletes, of instances or querysets,
+    call it through signals, ``QuerySet.update()`` sends none and has to
+    be followed by a call for every updated user.
+    """
+    key = get_user_cache_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def drop_cached_on_change(sender, instance, **kwargs):
+    drop_cached_user(instance.pk)
+
 
 class UserManager(BaseUserManager):
 
@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.models import drop_cached_user, get_user_cache_key
+
+ME_URL = reverse('user:me')
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='testpass',
+            name='name'
+        )
+        cache.delete(get_user_cache_key(self.user.pk))
+        self.addCleanup(cache.delete, get_user_cache_key(self.user.pk))
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}'
+        )
+
+    def test_user_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_password_not_cached(self):
+        self.client.get(ME_URL)
+
+        cached = cache.get(get_user_cache_key(self.user.pk))
+        self.assertNotIn('password', cached)
+        self.assertEqual(cached['email'], self.user.email)
+
+    def test_update_password_of_cached_user(self):
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(ME_URL, {'password': 'newpass'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpass'))
+
+    def test_update_drops_cached_user(self):
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(ME_URL, {'name': 'new name'})
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['name'], 'new name')
+
+    def test_inactive_user(self):
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIsNone(cache.get(get_user_cache_key(self.user.pk)))
+
+    def test_queryset_update_needs_explicit_drop(self):
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.filter(pk=self.user.pk) \
+                                    .update(is_active=False)
+            drop_cached_user(self.user.pk)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_queryset_delete_drops_cached_user(self):
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.filter(pk=self.user.pk).delete()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user(self):
+        self.client.get(ME_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)